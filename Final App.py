@@ -15,25 +15,36 @@ import dash
 import dash_html_components as html
 import dash_core_components as dcc
 
-import networkx as nx
-
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
 
 import base64
 import warnings
 
+import logging
+import os
+
+from aggregates import register_cube, selection_metrics, top_keys, top_rows
+from caching import CACHES, memoize_callback
+from collaboration import register_collaboration
+from data_store import DatasetRegistry
+from density import register_density, scatter_mode
+from ingest import ChartIngest, add_ingest_hook
+from instrumentation import add_metrics_route, instrument_callbacks, timed_phase
+from network import (EGO_LAYOUTS, GRAPH_LAYOUTS, arrow_angles, hex_colors, prune_edges, register_network,
+                     segment_coordinates, top_edges)
+from search import register_search
+from timeseries import downsample, register_timeseries, zoom_argument
+
 # Bringing in Data
-collab_data = pd.read_csv("./data/US_Spotify_Data.csv")
-collab_genres = pd.read_csv("./data/US_Spotify_Genre_Data.csv")
-collab_features_data = pd.read_csv("./data/US_Spotify_Audio_Features_Working_Data.csv")
-network_data = pd.read_csv("./data/Genre_Network_Data.csv")
-
-# Cleaning Up Some Columns
-collab_data['Date'] = pd.to_datetime(collab_data['Date'])
-collab_data['Album_release_dayweek'] = pd.Categorical(collab_data['Album_release_dayweek'],
-                                                      categories=['Mon', 'Tue', 'Wed',
-                                                                  'Thu', 'Fri', 'Sat', 'Sun'],
-                                                      ordered=True)
+# (each table is loaded the first time a tab or callback asks for it, from the Arrow IPC
+# store written by `python data_store.py convert` when it is current, otherwise from CSV)
+datasets = DatasetRegistry()
+register_cube(datasets)
+register_network(datasets)
+register_collaboration(datasets)
+register_timeseries(datasets)
+register_density(datasets)
+register_search(datasets)
 
 # Setting Colors
 colors = {
@@ -49,40 +60,6 @@ colors = {
                         'greenyellow']
 }
 
-# Setting Up A Function For Later...
-def create_edgelist(data):
-    # Create dictionary of track to genres of genres of artists
-    track_genre = {}
-    turi_list = list(data['Track URI2'])
-    g_list = list(data['Genre'])
-
-    for i in range(len(data)):
-
-        uri = turi_list[i]
-        genre = g_list[i]
-
-        if uri in track_genre:
-            track_genre[uri].append(genre)
-        else:
-            track_genre[uri] = [genre]
-
-    # Create Edgelist dataframee
-    track_list = []
-    genre1_list = []
-    genre2_list = []
-
-    for key, values in track_genre.items():
-        for i in range(1, len(values)):
-            track_list.append(key)
-            genre1_list.append(values[0])
-            genre2_list.append(values[i])
-
-    edge_list = pd.DataFrame({'Track URI2': track_list,
-                              'Artist Genre': genre1_list,
-                              'Collaborator Genre': genre2_list})
-
-    return edge_list
-
 # Loading in Header Photo
 image_filename = './assets/SpotifyImg.png'
 encoded_image = base64.b64encode(open(image_filename, 'rb').read())
@@ -144,6 +121,7 @@ app.layout = html.Div(style={'backgroundColor': colors['alt_bg_color']},
 #### Setting Up Tabs and Layout ####
 @app.callback(Output('tabs-content-classes', 'children'),
               Input('tabs-with-classes', 'value'))
+@timed_phase('compute')
 def render_content(tab):
     if tab == 'Overview':
         return html.Div([
@@ -183,7 +161,7 @@ def render_content(tab):
                     dcc.Dropdown(className='selection-box',
                                  id='genre_selections',
                                  options=[{'label': i, 'value': i} for i in
-                                          collab_genres['Artist Genre'].unique()],
+                                          datasets['collab_genres']['Artist Genre'].unique()],
                                  multi=True,
                                  value="None"),
                     style={'width': '60%', 'display': 'inline-block', 'vertical-align': 'left'}),
@@ -261,8 +239,7 @@ def render_content(tab):
                 html.Div(
                     dcc.Dropdown(className='selection-box',
                                  id='track_selections',
-                                 options=[{'label': i, 'value': i} for i in
-                                          collab_data['Track Name'].unique()],
+                                 options=dropdown_options('track_search'),
                                  multi=True,
                                  value="None"),
                     style={'width': '60%', 'display': 'inline-block', 'vertical-align': 'left'}),
@@ -285,8 +262,7 @@ def render_content(tab):
                 html.Div(
                     dcc.Dropdown(className='selection-box',
                                  id='track_revenue_selection',
-                                 options=[{'label': i, 'value': i} for i in
-                                          collab_data['Track Name'].unique()],
+                                 options=dropdown_options('track_search'),
                                  multi=True,
                                  value='None')),
             ]),
@@ -298,11 +274,10 @@ def render_content(tab):
                 html.Div(
                     dcc.Dropdown(className='selection-box',
                                  id='top_tracks_track_selection',
-                                 options=[{'label': i, 'value': i} for i in
-                                          collab_data['Track Name'].unique()],
+                                 options=dropdown_options('track_search'),
                                  multi=True,
                                  value="None"),
-                    style={'width': '60%', 'display': 'inline-block', 'vertical-align': 'left'}),
+                    style={'width': '50%', 'display': 'inline-block', 'vertical-align': 'left'}),
                 html.Div(
                     dcc.RadioItems(className='graph-radio-buttons2',
                                    id='top_tracks_data_source',
@@ -311,7 +286,17 @@ def render_content(tab):
                                        {'label': 'Streams', 'value': 'Streams'}],
                                    value='Position',
                                    labelStyle={'display': 'inline-block'}),
-                    style={'width': '40%', 'display': 'inline-block', 'vertical-align': 'right'})]),
+                    style={'width': '25%', 'display': 'inline-block', 'vertical-align': 'right'}),
+                html.Div(
+                    dcc.RadioItems(className='graph-radio-buttons2',
+                                   id='top_tracks_window',
+                                   options=[
+                                       {'label': 'Daily', 'value': 1},
+                                       {'label': '7 Days', 'value': 7},
+                                       {'label': '30 Days', 'value': 30}],
+                                   value=1,
+                                   labelStyle={'display': 'inline-block'}),
+                    style={'width': '25%', 'display': 'inline-block', 'vertical-align': 'right'})]),
             html.Div(className='graph-container',
                      children=[dcc.Graph(id='top_tracks_over_time_plot')]),
 
@@ -335,8 +320,7 @@ def render_content(tab):
                 html.Div(
                     dcc.Dropdown(className='selection-box',
                                  id='artist_selections',
-                                 options=[{'label': i, 'value': i} for i in
-                                          collab_data['Artist Name'].unique()],
+                                 options=dropdown_options('artist_search'),
                                  multi=True,
                                  value="None"),
                     style={'width': '60%', 'display': 'inline-block', 'vertical-align': 'left'}),
@@ -377,8 +361,7 @@ def render_content(tab):
                 html.Div(
                     dcc.Dropdown(className='selection-box',
                                  id='artist_selections2',
-                                 options=[{'label': i, 'value': i} for i in
-                                          collab_data['Artist Name'].unique()],
+                                 options=dropdown_options('artist_search'),
                                  multi=True,
                                  value='None')),
             ]),
@@ -482,6 +465,8 @@ def render_content(tab):
             html.Div(style={'background-color': '#000000', 'padding-bottom': '70px'})
         ])
     elif tab == 'Additional Info':
+        # The collaboration network opens on the artist with the most collaborators
+        most_connected = datasets['artist_graph'].most_connected()
         return html.Div([
             html.H1(children='Some Additional Factors'),
             html.Div(className='text-header',
@@ -536,7 +521,7 @@ def render_content(tab):
                     dcc.Dropdown(className='selection-box',
                                  id='genre_network_selections',
                                  options=[{'label': i, 'value': i} for i in
-                                          network_data['Genre'].unique()],
+                                          datasets['network_data']['Genre'].unique()],
                                  multi=True,
                                  value=[]),
                     style={'width': '50%', 'display': 'inline-block', 'vertical-align': 'left'}),
@@ -544,7 +529,7 @@ def render_content(tab):
                     dcc.Dropdown(className='selection-box',
                                  id='year_value',
                                  options=[{'label': i, 'value': i} for i in
-                                          network_data['Year'].unique()],
+                                          datasets['network_data']['Year'].unique()],
                                  multi=True,
                                  value=[]),
                     style={'width': '30%', 'display': 'inline-block', 'vertical-align': 'left'}),
@@ -557,220 +542,219 @@ def render_content(tab):
                                    value='Count',
                                    labelStyle={'display': 'inline-block'}),
                     style={'width': '20%', 'display': 'inline-block', 'vertical-align': 'right'})]),
+            html.Div(className='group-select-buttons', children=[
+                html.Div(
+                    dcc.RadioItems(className='graph-radio-buttons2',
+                                   id='network_layout',
+                                   options=[
+                                       {'label': 'Circular', 'value': 'circular'},
+                                       {'label': 'Spring', 'value': 'spring'},
+                                       {'label': 'Spectral', 'value': 'spectral'}],
+                                   value='circular',
+                                   labelStyle={'display': 'inline-block'}),
+                    style={'width': '35%', 'display': 'inline-block', 'vertical-align': 'left'}),
+                html.Div(
+                    dcc.RadioItems(className='graph-radio-buttons2',
+                                   id='network_pruning',
+                                   options=[
+                                       {'label': 'All Edges', 'value': 'all'},
+                                       {'label': 'Top Per Genre', 'value': 'per_genre'},
+                                       {'label': 'Top Overall', 'value': 'overall'},
+                                       {'label': 'Min Weight %', 'value': 'min_weight'}],
+                                   value='all',
+                                   labelStyle={'display': 'inline-block'}),
+                    style={'width': '50%', 'display': 'inline-block', 'vertical-align': 'right'}),
+                html.Div(
+                    dcc.Input(className='network-number-input',
+                              id='network_pruning_value',
+                              type='number',
+                              min=0,
+                              placeholder='K / N / %',
+                              debounce=True),
+                    style={'width': '15%', 'display': 'inline-block', 'vertical-align': 'right'})]),
             html.Div(className='graph-container',
                      children=[dcc.Graph(id='network_plot')]),
             html.Br(),
+            html.H2(children='Artist Collaboration Network'),
+            html.Div(className='group-select-buttons', children=[
+                html.Div(
+                    dcc.Dropdown(className='selection-box',
+                                 id='artist_network_selection',
+                                 options=dropdown_options('collaborator_search', selected=most_connected),
+                                 value=most_connected),
+                    style={'width': '70%', 'display': 'inline-block', 'vertical-align': 'left'}),
+                html.Div(
+                    dcc.RadioItems(className='graph-radio-buttons2',
+                                   id='artist_network_hops',
+                                   options=[
+                                       {'label': '1 Hop', 'value': 1},
+                                       {'label': '2 Hops', 'value': 2}],
+                                   value=1,
+                                   labelStyle={'display': 'inline-block'}),
+                    style={'width': '30%', 'display': 'inline-block', 'vertical-align': 'right'})]),
+            html.Div(className='graph-container',
+                     children=[dcc.Graph(id='artist_network_plot')]),
+            html.Br(),
             html.Div(style={'background-color': '#000000', 'padding-bottom': '70px'})
         ])
 
 
 ########## GRAPH FUNCTIONS #############
+#### Dropdown Search ####
+# The track and artist dropdowns hold one page of names, refilled from the search index as
+# the user types. Selected names stay in the options so they keep their labels.
+def dropdown_options(index, search_value=None, selected=None):
+    if selected is None or selected == 'None':
+        selected = []
+    elif not isinstance(selected, list):
+        selected = [selected]
+
+    names = selected + [name for name in datasets[index].search(search_value) if name not in selected]
+    return [{'label': i, 'value': i} for i in names]
+
+
+def register_dropdown_search(dropdown, index):
+    @timed_phase('compute')
+    def search_options(search_value, selected):
+        return dropdown_options(index, search_value, selected)
+
+    # Named per dropdown so /metrics reports each one separately
+    search_options.__name__ = dropdown + '_options'
+    app.callback(Output(dropdown, 'options'),
+                 Input(dropdown, 'search_value'),
+                 State(dropdown, 'value'),
+                 prevent_initial_call=True)(search_options)
+
+
+for dropdown, index in [('track_selections', 'track_search'),
+                        ('track_revenue_selection', 'track_search'),
+                        ('top_tracks_track_selection', 'track_search'),
+                        ('artist_selections', 'artist_search'),
+                        ('artist_selections2', 'artist_search'),
+                        ('artist_network_selection', 'collaborator_search')]:
+    register_dropdown_search(dropdown, index)
+
+
 #### Collaborator Box Plots ####
+# Radio Choice -> (Cube, Cube Column, Axis Label, Title)
+COLLAB_BAR_METRICS = {
+    'Count': ('collab_tracks', 'Count', 'Count of Tracks', 'Count of Collaborations in Dataset'),
+    'Position': ('collab_names', 'Position_mean', 'Average Position',
+                 'Average Position Based On Number of Collaborators'),
+    'Streams': ('collab_names', 'Streams_mean', 'Streams', 'Average Streams Based On Number of Collaborators'),
+    'Revenue': ('collab_names', 'Revenue_mean', 'Revenue', 'Average Revenue Based on Number of Collaborators'),
+}
+
+
 @app.callback(Output('collab_bar_chart', 'figure'),
               [Input('collab_data_source', 'value')])
+@memoize_callback()
 def collab_bar_charts(data_source):
-    if data_source == 'Count':
-        count_collaborators = (
-            collab_data.drop_duplicates("Track URI2")
-                .groupby(["No. of Artists"])
-                .count()
-                .reset_index()
-                .rename(columns={"Unnamed: 0": "Count of Tracks"})
-                .sort_values(by="No. of Artists", ascending=True)
-        )
-        count_collaborators = px.bar(count_collaborators, x="No. of Artists", y="Count of Tracks",
-                                     color_discrete_sequence=colors['collabbarcolors'],
-                                     title='Count of Collaborations in Dataset')
+    cube, column, label, title = COLLAB_BAR_METRICS[data_source]
 
-        count_collaborators.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
+    collaborators = (
+        datasets['cube_' + cube][column]
+            .reset_index(name=label)
+            .sort_values(by="No. of Artists", ascending=True)
+    )
 
-        return count_collaborators
+    collaborators = px.bar(collaborators, x="No. of Artists", y=label,
+                           color_discrete_sequence=colors['collabbarcolors'],
+                           title=title)
 
-    elif data_source == 'Position':
-        position_collaborators = (
-            collab_data.drop_duplicates("Track Name")
-                .groupby(["No. of Artists"])["Position"]
-                .mean()
-                .reset_index(name="Average Position")
-                .sort_values(by="No. of Artists", ascending=True)
-        )
-        position_collaborators = px.bar(position_collaborators, x="No. of Artists", y="Average Position",
-                                        color_discrete_sequence=colors['collabbarcolors'],
-                                        title='Average Position Based On Number of Collaborators'
-                                        )
+    collaborators.update_layout(
+        plot_bgcolor=colors['plot_bg_color'],
+        paper_bgcolor=colors['plot_bg_color'],
+        font_color=colors['txt_color1']
+    )
 
-        position_collaborators.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
-        return position_collaborators
-
-    elif data_source == 'Streams':
-        streams_collaborators = (
-            collab_data.drop_duplicates("Track Name")
-                .groupby(["No. of Artists"])["Streams"]
-                .mean()
-                .reset_index(name="Streams")
-                .sort_values(by="No. of Artists", ascending=True)
-        )
-        streams_collaborators = px.bar(streams_collaborators, x="No. of Artists", y="Streams",
-                                       color_discrete_sequence=colors['collabbarcolors'],
-                                       title='Average Streams Based On Number of Collaborators')
+    return collaborators
 
-        streams_collaborators.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
-        return streams_collaborators
-
-    elif data_source == 'Revenue':
-        revenue_collaborators = (
-            collab_data.drop_duplicates("Track Name")
-                .groupby(["No. of Artists"])["Revenue"]
-                .mean()
-                .reset_index(name="Revenue")
-                .sort_values(by="No. of Artists", ascending=True)
-        )
 
-        revenue_collaborators = px.bar(revenue_collaborators, x="No. of Artists", y="Revenue",
-                                       color_discrete_sequence=colors['collabbarcolors'],
-                                       title='Average Revenue Based on Number of Collaborators')
+#### Ranked Bar Charts ####
+# Shared by the genre, track and artist metric plots. Every radio choice is a column of the
+# same per-selection frame, so switching metrics only rebuilds the figure.
+def ranked_bar_chart(name, key, data_source, chart_metrics, selected, bar_colors):
+    column, label, ascending, title = chart_metrics[data_source]
 
-        revenue_collaborators.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
+    # Without a selection only the top five are shown, read straight from the rankings
+    if selected == 'None' or selected == []:
+        ranked = (
+            top_rows(datasets, name, column, ascending, 5)[column]
+                .reset_index(name=label)
         )
-        return revenue_collaborators
-
+        if ascending:
+            ranked = ranked.sort_values(by=label, ascending=False)
 
-#### Genre Metric Plots ####
-@app.callback(Output('genre_bar_chart', 'figure'),
-              Input('genre_data_source', 'value'),
-              Input('genre_selections', 'value'))
-def genre_bar_charts(data_source, genres):
-    if genres == 'None' or genres == []:
-        select_collab_genres = collab_genres.copy()
     else:
-        select_collab_genres = collab_genres[collab_genres['Artist Genre'].isin(genres)]
-
-    if data_source == 'Count':
-        count_genres = (
-            select_collab_genres
-                .groupby(["Artist Genre"])
-                .count()
-                .reset_index()
-                .rename(columns={"Unnamed: 0": "Count of Artists"})
-                .sort_values(by="Count of Artists", ascending=False)
+        ranked = (
+            selection_metrics(datasets, name, selected)[column]
+                .reset_index(name=label)
+                .sort_values(by=label, ascending=ascending)
         )
 
-        if genres == 'None' or genres == []:
-            count_genres = count_genres.head(5)
-        else:
-            pass
-
-        count_genres = px.bar(count_genres, x="Count of Artists", y="Artist Genre", orientation='h',
-                              color_discrete_sequence=colors['collabbarcolors'],
-                              title='Count of Artists For Each Genre')
+    ranked = px.bar(ranked, x=label, y=key, orientation='h',
+                    color_discrete_sequence=bar_colors,
+                    title=title)
 
-        count_genres.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
+    ranked.update_layout(
+        plot_bgcolor=colors['plot_bg_color'],
+        paper_bgcolor=colors['plot_bg_color'],
+        font_color=colors['txt_color1']
+    )
 
-        return count_genres
+    return ranked
 
-    elif data_source == 'Position':
-        position_genres = (
-            select_collab_genres
-                .groupby(["Artist Genre"])["Position"]
-                .mean()
-                .reset_index(name="Average Position")
-                .sort_values(by="Average Position", ascending=True)
-        )
 
-        if genres == 'None' or genres == []:
-            position_genres = position_genres.head(5).sort_values(by="Average Position", ascending=False)
-        else:
-            pass
+#### Genre Metric Plots ####
+# Radio Choice -> (Cube Column, Axis Label, Sort Ascending, Title)
+GENRE_BAR_METRICS = {
+    'Count': ('Count', 'Count of Artists', False, 'Count of Artists For Each Genre'),
+    'Position': ('Position_mean', 'Average Position', True, 'Average Position For Each Genre'),
+    'Streams': ('Streams_mean', 'Average Streams', False, 'Average Streams For Each Genre'),
+    'Revenue': ('Revenue_mean', 'Average Revenue', False, 'Average Revenue For Each Genre'),
+}
 
-        position_genres = px.bar(position_genres, x="Average Position", y="Artist Genre", orientation='h',
-                                 color_discrete_sequence=colors['collabbarcolors'],
-                                 title='Average Position For Each Genre')
 
-        position_genres.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
-        return position_genres
-
-    elif data_source == 'Streams':
-        streams_genres = (
-            select_collab_genres
-                .groupby(["Artist Genre"])["Streams"]
-                .mean()
-                .reset_index(name="Average Streams")
-                .sort_values(by="Average Streams", ascending=False)
-        )
-
-        if genres == 'None' or genres == []:
-            streams_genres = streams_genres.head(5)
-        else:
-            pass
+@app.callback(Output('genre_bar_chart', 'figure'),
+              Input('genre_data_source', 'value'),
+              Input('genre_selections', 'value'))
+@memoize_callback()
+def genre_bar_charts(data_source, genres):
+    return ranked_bar_chart('genre', "Artist Genre", data_source, GENRE_BAR_METRICS, genres,
+                            colors['collabbarcolors'])
 
-        streams_genres = px.bar(streams_genres, x="Average Streams", y="Artist Genre", orientation='h',
-                                color_discrete_sequence=colors['collabbarcolors'],
-                                title='Average Streams For Each Genre')
 
-        streams_genres.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
-        return streams_genres
-
-    elif data_source == 'Revenue':
-        revenue_genres = (
-            select_collab_genres
-                .groupby(["Artist Genre"])["Revenue"]
-                .mean()
-                .reset_index(name="Average Revenue")
-                .sort_values(by="Average Revenue", ascending=False)
-        )
+#### All Rows Position Plots ####
+# Every row is drawn while that stays cheap (WebGL past SCATTER_WEBGL_ROWS rows); past
+# SCATTER_DENSITY_ROWS the precomputed position x metric bins are drawn as a heatmap
+def all_rows_position_plot(metric, title):
+    collab_data = datasets['collab_data']
+    mode = scatter_mode(len(collab_data))
+    if mode != 'density':
+        return px.scatter(collab_data, x="Position", y=metric, color_discrete_sequence=[colors['main_color']],
+                          title=title, render_mode='webgl' if mode == 'webgl' else 'svg')
 
-        if genres == 'None' or genres == []:
-            revenue_genres = revenue_genres.head(5)
-        else:
-            pass
+    position_edges, metric_edges, counts = datasets['position_density'].grid(metric)
 
-        revenue_genres = px.bar(revenue_genres, x="Average Revenue", y="Artist Genre", orientation='h',
-                                color_discrete_sequence=colors['collabbarcolors'],
-                                title='Average Revenue For Each Genre')
+    density_plot = go.Figure(go.Heatmap(x=position_edges, y=metric_edges, z=np.where(counts > 0, counts, np.nan),
+                                        colorscale=[[0, 'darkgreen'], [0.5, colors['main_color']],
+                                                    [1, 'greenyellow']],
+                                        colorbar=dict(title='Rows'),
+                                        hovertemplate='Position: %{x}<br>' + metric +
+                                                      ': %{y:,.0f}<br>Rows: %{z}<extra></extra>'))
+    density_plot.update_layout(title=title, xaxis_title='Position', yaxis_title=metric, yaxis_type='log')
 
-        revenue_genres.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
-        return revenue_genres
+    return density_plot
 
 
 #### Position Metrics Plots - All Streams/ Average ####
 @app.callback(Output('position_streams_bar_chart', 'figure'),
               [Input('position_streams_data_source', 'value')])
+@memoize_callback()
 def position_streams_charts(data_source):
     if data_source == 'All Streams':
-        streams_position = px.scatter(collab_data, x="Position", y="Streams",
-                                      color_discrete_sequence=[colors['main_color']],
-                                      title='All Streams Compared to Position')
+        streams_position = all_rows_position_plot('Streams', 'All Streams Compared to Position')
 
         streams_position.update_layout(
             plot_bgcolor=colors['plot_bg_color'],
@@ -782,8 +766,7 @@ def position_streams_charts(data_source):
 
     elif data_source == 'Average Streams':
         average_streams_position = (
-            collab_data.groupby(["Position"])["Streams"]
-                .mean()
+            datasets['cube_position']["Streams_mean"]
                 .reset_index(name='Average Streams')
         )
 
@@ -803,11 +786,10 @@ def position_streams_charts(data_source):
 #### Position Metrics Plots - All Revenues/ Average ####
 @app.callback(Output('position_revenue_bar_chart', 'figure'),
               [Input('position_revenue_data_source', 'value')])
+@memoize_callback()
 def position_revenue_bar_charts(data_source):
     if data_source == 'All Revenues':
-        revenue_position = px.scatter(collab_data, x="Position", y="Revenue",
-                                      color_discrete_sequence=[colors['main_color']],
-                                      title='All Revenues Compared to Position')
+        revenue_position = all_rows_position_plot('Revenue', 'All Revenues Compared to Position')
 
         revenue_position.update_layout(
             plot_bgcolor=colors['plot_bg_color'],
@@ -819,8 +801,7 @@ def position_revenue_bar_charts(data_source):
 
     elif data_source == 'Average Revenues':
         average_revenue_position = (
-            collab_data.groupby(["Position"])["Revenue"]
-                .mean()
+            datasets['cube_position']["Revenue_mean"]
                 .reset_index(name='Average Revenue')
         )
 
@@ -838,141 +819,42 @@ def position_revenue_bar_charts(data_source):
 
 
 #### Track Metric Plots ####
+TRACK_BAR_METRICS = {
+    'Count': ('Count', 'Count', False, 'Count of Tracks In The Dataset'),
+    'Position': ('Position_mean', 'Average Position', True, 'Average Position For Each Track'),
+    'Streams': ('Streams_mean', 'Average Streams', True, 'Average Streams For Each Track'),
+    'Revenue': ('Revenue_mean', 'Average Revenue', True, 'Average Revenue For Each Artist'),
+}
+
+
 @app.callback(Output('track_bar_chart', 'figure'),
               Input('track_data_source', 'value'),
               Input('track_selections', 'value'))
+@memoize_callback()
 def track_bar_charts(data_source, track_names):
-    if track_names == 'None' or track_names == []:
-        select_collab_tracks = collab_data.copy()
-    else:
-        select_collab_tracks = collab_data[collab_data['Track Name'].isin(track_names)]
-
-    if data_source == 'Count':
-        count_tracks = (
-            select_collab_tracks
-                .groupby(["Track Name"])
-                .count()
-                .reset_index()
-                .rename(columns={"Unnamed: 0": "Count"})
-                .sort_values(by="Count", ascending=False)
-        )
-
-        if track_names == 'None' or track_names == []:
-            count_tracks = count_tracks.head(5)
-        else:
-            pass
-
-        count_tracks = px.bar(count_tracks, x="Count", y="Track Name", orientation='h',
-                              color_discrete_sequence=colors['genrebarcolors'],
-                              title='Count of Tracks In The Dataset')
-
-        count_tracks.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
-
-        return count_tracks
-
-    elif data_source == 'Position':
-        position_tracks = (
-            select_collab_tracks
-                .groupby(["Track Name"])["Position"]
-                .mean()
-                .reset_index(name="Average Position")
-                .sort_values(by="Average Position", ascending=True)
-        )
-
-        if track_names == 'None' or track_names == []:
-            position_tracks = position_tracks.head(5).sort_values(by="Average Position", ascending=False)
-        else:
-            pass
-
-        position_tracks = px.bar(position_tracks, x="Average Position", y="Track Name", orientation='h',
-                                 color_discrete_sequence=colors['genrebarcolors'],
-                                 title='Average Position For Each Track')
-
-        position_tracks.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
-        return position_tracks
-
-    elif data_source == 'Streams':
-        streams_tracks = (
-            select_collab_tracks
-                .groupby(["Track Name"])["Streams"]
-                .mean()
-                .reset_index(name="Average Streams")
-                .sort_values(by="Average Streams", ascending=True)
-        )
-
-        if track_names == 'None' or track_names == []:
-            streams_tracks = streams_tracks.head(5).sort_values(by="Average Streams", ascending=False)
-        else:
-            pass
-
-        streams_tracks = px.bar(streams_tracks, x="Average Streams", y="Track Name", orientation='h',
-                                color_discrete_sequence=colors['genrebarcolors'],
-                                title='Average Streams For Each Track')
-
-        streams_tracks.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
-        return streams_tracks
-
-    elif data_source == 'Revenue':
-        revenue_tracks = (
-            select_collab_tracks
-                .groupby(["Track Name"])["Revenue"]
-                .mean()
-                .reset_index(name="Average Revenue")
-                .sort_values(by="Average Revenue", ascending=True)
-        )
-
-        if track_names == 'None' or track_names == []:
-            revenue_tracks = revenue_tracks.head(5).sort_values(by="Average Revenue", ascending=False)
-        else:
-            pass
-
-        revenue_tracks = px.bar(revenue_tracks, x="Average Revenue", y="Track Name", orientation='h',
-                                color_discrete_sequence=colors['genrebarcolors'],
-                                title='Average Revenue For Each Artist')
-
-        revenue_tracks.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
-        return revenue_tracks
+    return ranked_bar_chart('track', "Track Name", data_source, TRACK_BAR_METRICS, track_names,
+                            colors['genrebarcolors'])
 
 
 #### Track Revenue Over Time ####
 # Timeline selector is not necessary... should be implicitly in figure...
 @app.callback(Output('track_revenue_over_time_plot', 'figure'),
-              Input('track_revenue_selection', 'value'))
-def track_revenue_over_time(tracks):
+              Input('track_revenue_selection', 'value'),
+              Input('track_revenue_over_time_plot', 'relayoutData'))
+@zoom_argument(1)
+@memoize_callback()
+def track_revenue_over_time(tracks, zoom=None):
     if tracks == 'None' or tracks == []:
-        revenue_top_tracks = (
-            collab_data.groupby(['Track Name'])['Revenue']
-                .mean()
-                .reset_index(name='Average Revenue')
-                .sort_values(by='Average Revenue', ascending=False)
-                .head(15)
-        )
+        revenue_top_tracks = top_keys(datasets, 'track', 'Revenue_mean', False, 15)
 
     else:
-        revenue_top_tracks = collab_data[collab_data['Track Name'].isin(tracks)]
+        revenue_top_tracks = tracks
 
-    track_revenue_overtime = (
-        collab_data[collab_data['Track Name'].isin(list(revenue_top_tracks['Track Name']))]
-            .groupby(['Track Name', 'Date'])['Revenue']
-            .mean()
-            .reset_index(name='Average Revenue')
-    )
+    track_revenue_overtime = datasets['track_series'].frame(revenue_top_tracks, 'Revenue', 'Average Revenue')
+
+    # Thin every series to the point budget, keeping full detail inside the zoomed range
+    track_revenue_overtime = downsample(track_revenue_overtime, 'Track Name', 'Average Revenue',
+                                        window=zoom)
 
     track_revenue_plot = px.line(track_revenue_overtime, x="Date", y="Average Revenue", color='Track Name',
                                  color_discrete_sequence=colors['collabbarcolors'],
@@ -982,6 +864,8 @@ def track_revenue_over_time(tracks):
         plot_bgcolor=colors['plot_bg_color'],
         paper_bgcolor=colors['plot_bg_color'],
         font_color=colors['txt_color1'],
+        # Keep the reader's zoom when the refined figure comes back
+        uirevision='zoom',
         xaxis=dict(
             rangeselector=dict(
                 buttons=list([
@@ -1012,31 +896,46 @@ def track_revenue_over_time(tracks):
 
 
 #### Top Tracks Over Time ####
+# Window Selector: Metric -> (Rolling Statistic, Axis Label). Streams are averaged over the
+# window and position takes its best (lowest) day; a one day window is the daily average.
+TREND_WINDOW_STATS = {
+    'Position': ('min', '{} Day Best Position'),
+    'Streams': ('mean', '{} Day Average Streams'),
+}
+
+
+def trend_window(metric, window):
+    if window == 1:
+        return 'mean', 'Average ' + metric
+
+    stat, label = TREND_WINDOW_STATS[metric]
+    return stat, label.format(window)
+
+
 @app.callback(Output('top_tracks_over_time_plot', 'figure'),
               Input('top_tracks_data_source', 'value'),
-              Input('top_tracks_track_selection', 'value'))
-def top_tracks_over_time(data_source, tracks):
+              Input('top_tracks_track_selection', 'value'),
+              Input('top_tracks_window', 'value'),
+              Input('top_tracks_over_time_plot', 'relayoutData'))
+@zoom_argument(3)
+@memoize_callback()
+def top_tracks_over_time(data_source, tracks, window=1, zoom=None):
     if data_source == 'Position':
         if tracks == 'None' or tracks == []:
-            top_tracks = (
-                collab_data.groupby(['Track Name'])['Position']
-                    .mean()
-                    .reset_index(name='Average Position')
-                    .sort_values(by='Average Position', ascending=True)
-                    .head(15)
-            )
+            top_tracks = top_keys(datasets, 'track', 'Position_mean', True, 15)
 
         else:
-            top_tracks = collab_data[collab_data['Track Name'].isin(tracks)]
+            top_tracks = tracks
 
-        track_position_overtime = (
-            collab_data[collab_data['Track Name'].isin(list(top_tracks['Track Name']))]
-                .groupby(['Track Name', 'Date'])['Position']
-                .mean()
-                .reset_index(name='Average Position')
-        )
+        stat, label = trend_window('Position', window)
+        track_position_overtime = datasets['track_series'].frame(top_tracks, 'Position', label,
+                                                                 window=window, stat=stat)
+
+        # Thin every series to the point budget, keeping full detail inside the zoomed range
+        track_position_overtime = downsample(track_position_overtime, 'Track Name', label,
+                                             window=zoom)
 
-        track_position_plot = px.line(track_position_overtime, x="Date", y="Average Position",
+        track_position_plot = px.line(track_position_overtime, x="Date", y=label,
                                       title='Top Tracks Over Time Based on Position',
                                       color_discrete_sequence=colors['collabbarcolors'], color='Track Name')
 
@@ -1044,6 +943,8 @@ def top_tracks_over_time(data_source, tracks):
             plot_bgcolor=colors['plot_bg_color'],
             paper_bgcolor=colors['plot_bg_color'],
             font_color=colors['txt_color1'],
+            # Keep the reader's zoom when the refined figure comes back
+            uirevision='zoom',
             xaxis=dict(
                 rangeselector=dict(
                     buttons=list([
@@ -1074,25 +975,20 @@ def top_tracks_over_time(data_source, tracks):
 
     if data_source == 'Streams':
         if tracks == 'None' or tracks == []:
-            top_tracks = (
-                collab_data.groupby(['Track Name'])['Streams']
-                    .mean()
-                    .reset_index(name='Average Streams')
-                    .sort_values(by='Average Streams', ascending=True)
-                    .head(15)
-            )
+            top_tracks = top_keys(datasets, 'track', 'Streams_mean', True, 15)
 
         else:
-            top_tracks = collab_data[collab_data['Track Name'].isin(tracks)]
+            top_tracks = tracks
 
-        track_streams_overtime = (
-            collab_data[collab_data['Track Name'].isin(list(top_tracks['Track Name']))]
-                .groupby(['Track Name', 'Date'])['Streams']
-                .mean()
-                .reset_index(name='Average Streams')
-        )
+        stat, label = trend_window('Streams', window)
+        track_streams_overtime = datasets['track_series'].frame(top_tracks, 'Streams', label,
+                                                                window=window, stat=stat)
 
-        track_streams_plot = px.line(track_streams_overtime, x="Date", y="Average Streams",
+        # Thin every series to the point budget, keeping full detail inside the zoomed range
+        track_streams_overtime = downsample(track_streams_overtime, 'Track Name', label,
+                                            window=zoom)
+
+        track_streams_plot = px.line(track_streams_overtime, x="Date", y=label,
                                      title='Top Tracks Over Time Based on Streams',
                                      color_discrete_sequence=colors['collabbarcolors'], color='Track Name')
 
@@ -1100,6 +996,8 @@ def top_tracks_over_time(data_source, tracks):
             plot_bgcolor=colors['plot_bg_color'],
             paper_bgcolor=colors['plot_bg_color'],
             font_color=colors['txt_color1'],
+            # Keep the reader's zoom when the refined figure comes back
+            uirevision='zoom',
             xaxis=dict(
                 rangeselector=dict(
                     buttons=list([
@@ -1130,122 +1028,29 @@ def top_tracks_over_time(data_source, tracks):
 
 
 #### Artist Metric Plots ####
+ARTIST_BAR_METRICS = {
+    'Count': ('Count', 'Count', False, 'Count of Artist Occurences In The Dataset'),
+    'Position': ('Position_mean', 'Average Position', True, 'Average Position For Each Artist'),
+    'Streams': ('Streams_mean', 'Average Streams', True, 'Average Streams For Each Artist'),
+    'Revenue': ('Revenue_mean', 'Average Revenue', True, 'Average Revenue For Each Artist'),
+}
+
+
 @app.callback(Output('artist_bar_chart', 'figure'),
               Input('artist_data_source', 'value'),
               Input('artist_selections', 'value'))
+@memoize_callback()
 def artist_bar_charts(data_source, artist_names):
-    if artist_names == 'None' or artist_names == []:
-        select_collab_artists = collab_data.copy()
-    else:
-        select_collab_artists = collab_data[collab_data['Artist Name'].isin(artist_names)]
-
-    if data_source == 'Count':
-        count_artists = (
-            select_collab_artists
-                .groupby(["Artist Name"])
-                .count()
-                .reset_index()
-                .rename(columns={"Unnamed: 0": "Count"})
-                .sort_values(by="Count", ascending=False)
-        )
-
-        if artist_names == 'None' or artist_names == []:
-            count_artists = count_artists.head(5)
-        else:
-            pass
-
-        count_artists = px.bar(count_artists, x="Count", y="Artist Name", orientation='h',
-                               color_discrete_sequence=colors['genrebarcolors'],
-                               title='Count of Artist Occurences In The Dataset')
-
-        count_artists.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
-
-        return count_artists
-
-    elif data_source == 'Position':
-        position_artists = (
-            select_collab_artists
-                .groupby(["Artist Name"])["Position"]
-                .mean()
-                .reset_index(name="Average Position")
-                .sort_values(by="Average Position", ascending=True)
-        )
-
-        if artist_names == 'None' or artist_names == []:
-            position_artists = position_artists.head(5).sort_values(by="Average Position", ascending=False)
-        else:
-            pass
-
-        position_artists = px.bar(position_artists, x="Average Position", y="Artist Name", orientation='h',
-                                  color_discrete_sequence=colors['genrebarcolors'],
-                                  title='Average Position For Each Artist')
-
-        position_artists.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
-        return position_artists
-
-    elif data_source == 'Streams':
-        streams_artists = (
-            select_collab_artists
-                .groupby(["Artist Name"])["Streams"]
-                .mean()
-                .reset_index(name="Average Streams")
-                .sort_values(by="Average Streams", ascending=True)
-        )
-
-        if artist_names == 'None' or artist_names == []:
-            streams_artists = streams_artists.head(5).sort_values(by="Average Streams", ascending=False)
-        else:
-            pass
-
-        streams_artists = px.bar(streams_artists, x="Average Streams", y="Artist Name", orientation='h',
-                                 color_discrete_sequence=colors['genrebarcolors'],
-                                 title='Average Streams For Each Artist')
-
-        streams_artists.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
-        return streams_artists
-
-    elif data_source == 'Revenue':
-        revenue_artists = (
-            select_collab_artists
-                .groupby(["Artist Name"])["Revenue"]
-                .mean()
-                .reset_index(name="Average Revenue")
-                .sort_values(by="Average Revenue", ascending=True)
-        )
-
-        if artist_names == 'None' or artist_names == []:
-            revenue_artists = revenue_artists.head(5).sort_values(by="Average Revenue", ascending=False)
-        else:
-            pass
-
-        revenue_artists = px.bar(revenue_artists, x="Average Revenue", y="Artist Name", orientation='h',
-                                 color_discrete_sequence=colors['genrebarcolors'],
-                                 title='Average Revenue For Each Artist')
-
-        revenue_artists.update_layout(
-            plot_bgcolor=colors['plot_bg_color'],
-            paper_bgcolor=colors['plot_bg_color'],
-            font_color=colors['txt_color1']
-        )
-        return revenue_artists
+    return ranked_bar_chart('artist', "Artist Name", data_source, ARTIST_BAR_METRICS, artist_names,
+                            colors['genrebarcolors'])
 
 
 #### Artist Radar Graphs ####
 @app.callback(Output('artist_radar_graph', 'figure'),
               Input('artist_selections2', 'value'))
+@memoize_callback()
 def audio_radial_graph(artist_names):
+    collab_features_data = datasets['collab_features_data']
     if artist_names == 'None' or artist_names == []:
         select_audio_features = collab_features_data[collab_features_data['Artist Name'].isin(
             ['Drake', 'Post Malone', 'Travis Scott', 'Khalid', 'Juice WRLD'])]
@@ -1277,14 +1082,12 @@ def audio_radial_graph(artist_names):
 #### Count Metrics By Length Of Time ####
 @app.callback(Output('count_time_plot', 'figure'),
               Input('track_artist', 'value'))
+@memoize_callback()
 def count_days(track_artist):
     if track_artist == 'Artists':
         count_artistdays = (
-            collab_data
-                .groupby(['Artist_days_onchart'])
-                .count()
-                .reset_index()
-                .rename(columns={"Artist Name": "Count"})
+            datasets['cube_artist_days']['Count']
+                .reset_index(name="Count")
         )
 
         count_artistdays = px.scatter(count_artistdays, x="Artist_days_onchart", y="Count",
@@ -1303,11 +1106,8 @@ def count_days(track_artist):
 
     elif track_artist == 'Tracks':
         count_trackdays = (
-            collab_data
-                .groupby(['Song_days_onchart'])
-                .count()
-                .reset_index()
-                .rename(columns={"Track URI2": "Count"})
+            datasets['cube_track_days']['Count']
+                .reset_index(name="Count")
         )
 
         count_trackdays = px.scatter(count_trackdays, x="Song_days_onchart", y="Count",
@@ -1329,13 +1129,13 @@ def count_days(track_artist):
 @app.callback(Output('tracks_on_chart_plot', 'figure'),
               Input('tracks_on_chart_avg_or_max', 'value'),
               Input('tracks_on_chart_data_source', 'value'))
+@memoize_callback()
 def track_on_chart(avg_or_max, data_source):
     if avg_or_max == 'Average':
         if data_source == 'Position':
             average_position_trackdays = (
-                collab_data.groupby(["Song_days_onchart"])["Position"]
-                    .mean()
-                    .reset_index()
+                datasets['cube_track_days']["Position_mean"]
+                    .reset_index(name="Position")
             )
 
             average_position_trackdays = px.scatter(average_position_trackdays, x="Song_days_onchart", y="Position",
@@ -1354,9 +1154,8 @@ def track_on_chart(avg_or_max, data_source):
 
         elif data_source == 'Streams':
             average_streams_trackdays = (
-                collab_data.groupby(["Song_days_onchart"])["Streams"]
-                    .mean()
-                    .reset_index()
+                datasets['cube_track_days']["Streams_mean"]
+                    .reset_index(name="Streams")
             )
 
             average_streams_trackdays = px.scatter(average_streams_trackdays, x="Song_days_onchart", y="Streams",
@@ -1375,9 +1174,8 @@ def track_on_chart(avg_or_max, data_source):
 
         elif data_source == 'Revenue':
             average_revenue_trackdays = (
-                collab_data.groupby(["Song_days_onchart"])["Revenue"]
-                    .mean()
-                    .reset_index()
+                datasets['cube_track_days']["Revenue_mean"]
+                    .reset_index(name="Revenue")
             )
 
             average_revenue_trackdays = px.scatter(average_revenue_trackdays, x="Song_days_onchart", y="Revenue",
@@ -1397,9 +1195,8 @@ def track_on_chart(avg_or_max, data_source):
     elif avg_or_max == 'Max':
         if data_source == 'Position':
             max_position_trackdays = (
-                collab_data.groupby(["Song_days_onchart"])["Position"]
-                    .min()
-                    .reset_index()
+                datasets['cube_track_days']["Position_min"]
+                    .reset_index(name="Position")
             )
 
             max_position_trackdays = px.scatter(max_position_trackdays, x="Song_days_onchart", y="Position",
@@ -1418,9 +1215,8 @@ def track_on_chart(avg_or_max, data_source):
 
         elif data_source == 'Streams':
             max_streams_trackdays = (
-                collab_data.groupby(["Song_days_onchart"])["Streams"]
-                    .max()
-                    .reset_index()
+                datasets['cube_track_days']["Streams_max"]
+                    .reset_index(name="Streams")
             )
 
             max_streams_trackdays = px.scatter(max_streams_trackdays, x="Song_days_onchart", y="Streams",
@@ -1439,9 +1235,8 @@ def track_on_chart(avg_or_max, data_source):
 
         elif data_source == 'Revenue':
             max_revenue_trackdays = (
-                collab_data.groupby(["Song_days_onchart"])["Revenue"]
-                    .max()
-                    .reset_index()
+                datasets['cube_track_days']["Revenue_max"]
+                    .reset_index(name="Revenue")
             )
 
             max_revenue_trackdays = px.scatter(max_revenue_trackdays, x="Song_days_onchart", y="Revenue",
@@ -1463,13 +1258,13 @@ def track_on_chart(avg_or_max, data_source):
 @app.callback(Output('artist_on_chart_plot', 'figure'),
               Input('artist_on_chart_avg_or_max', 'value'),
               Input('artist_on_chart_data_source', 'value'))
+@memoize_callback()
 def artist_on_chart(avg_or_max, data_source):
     if avg_or_max == 'Average':
         if data_source == 'Position':
             average_position_artistdays = (
-                collab_data.groupby(["Artist_days_onchart"])["Position"]
-                    .mean()
-                    .reset_index()
+                datasets['cube_artist_days']["Position_mean"]
+                    .reset_index(name="Position")
             )
 
             average_position_artistdays = px.scatter(average_position_artistdays, x="Artist_days_onchart", y="Position",
@@ -1488,9 +1283,8 @@ def artist_on_chart(avg_or_max, data_source):
 
         elif data_source == 'Streams':
             average_streams_artistdays = (
-                collab_data.groupby(["Artist_days_onchart"])["Streams"]
-                    .mean()
-                    .reset_index()
+                datasets['cube_artist_days']["Streams_mean"]
+                    .reset_index(name="Streams")
             )
 
             average_streams_artistdays = px.scatter(average_streams_artistdays, x="Artist_days_onchart", y="Streams",
@@ -1509,9 +1303,8 @@ def artist_on_chart(avg_or_max, data_source):
 
         elif data_source == 'Revenue':
             average_revenue_artistdays = (
-                collab_data.groupby(["Artist_days_onchart"])["Revenue"]
-                    .mean()
-                    .reset_index()
+                datasets['cube_artist_days']["Revenue_mean"]
+                    .reset_index(name="Revenue")
             )
 
             average_revenue_artistdays = px.scatter(average_revenue_artistdays, x="Artist_days_onchart", y="Revenue",
@@ -1531,9 +1324,8 @@ def artist_on_chart(avg_or_max, data_source):
     elif avg_or_max == 'Max':
         if data_source == 'Position':
             max_position_artistdays = (
-                collab_data.groupby(["Artist_days_onchart"])["Position"]
-                    .min()
-                    .reset_index()
+                datasets['cube_artist_days']["Position_min"]
+                    .reset_index(name="Position")
             )
 
             max_position_artistdays = px.scatter(max_position_artistdays, x="Artist_days_onchart", y="Position",
@@ -1552,9 +1344,8 @@ def artist_on_chart(avg_or_max, data_source):
 
         elif data_source == 'Streams':
             max_streams_artistdays = (
-                collab_data.groupby(["Artist_days_onchart"])["Streams"]
-                    .max()
-                    .reset_index()
+                datasets['cube_artist_days']["Streams_max"]
+                    .reset_index(name="Streams")
             )
 
             max_streams_artistdays = px.scatter(max_streams_artistdays, x="Artist_days_onchart", y="Streams",
@@ -1573,9 +1364,8 @@ def artist_on_chart(avg_or_max, data_source):
 
         elif data_source == 'Revenue':
             max_revenue_artistdays = (
-                collab_data.groupby(["Artist_days_onchart"])["Revenue"]
-                    .max()
-                    .reset_index()
+                datasets['cube_artist_days']["Revenue_max"]
+                    .reset_index(name="Revenue")
             )
 
             max_revenue_artistdays = px.scatter(max_revenue_artistdays, x="Artist_days_onchart", y="Revenue",
@@ -1597,14 +1387,13 @@ def artist_on_chart(avg_or_max, data_source):
 @app.callback(Output('collab_artist_on_chart_plot', 'figure'),
               Input('collab_artist_on_chart_avg_or_max', 'value'),
               Input('collab_artist_on_chart_data_source', 'value'))
+@memoize_callback()
 def collab_artist_on_chart(avg_or_max, data_source):
     if avg_or_max == 'Average':
         if data_source == 'Position':
             average_position_collab_artistdays = (
-                collab_data.drop_duplicates('Track URI2')
-                    .groupby(["Collab_avg_days_onchart"])["Position"]
-                    .mean()
-                    .reset_index()
+                datasets['cube_collab_days']["Position_mean"]
+                    .reset_index(name="Position")
             )
 
             average_position_collab_artistdays = px.scatter(average_position_collab_artistdays,
@@ -1624,10 +1413,8 @@ def collab_artist_on_chart(avg_or_max, data_source):
 
         elif data_source == 'Streams':
             average_streams_collab_artistdays = (
-                collab_data.drop_duplicates('Track URI2')
-                    .groupby(["Collab_avg_days_onchart"])["Streams"]
-                    .mean()
-                    .reset_index()
+                datasets['cube_collab_days']["Streams_mean"]
+                    .reset_index(name="Streams")
             )
 
             average_streams_collab_artistdays = px.scatter(average_streams_collab_artistdays,
@@ -1647,10 +1434,8 @@ def collab_artist_on_chart(avg_or_max, data_source):
 
         elif data_source == 'Revenue':
             average_revenue_collab_artistdays = (
-                collab_data.drop_duplicates('Track URI2')
-                    .groupby(["Collab_avg_days_onchart"])["Revenue"]
-                    .mean()
-                    .reset_index()
+                datasets['cube_collab_days']["Revenue_mean"]
+                    .reset_index(name="Revenue")
             )
 
             average_revenue_collab_artistdays = px.scatter(average_revenue_collab_artistdays,
@@ -1671,10 +1456,8 @@ def collab_artist_on_chart(avg_or_max, data_source):
     elif avg_or_max == 'Max':
         if data_source == 'Position':
             max_position_collab_artistdays = (
-                collab_data.drop_duplicates('Track URI2')
-                    .groupby(["Collab_avg_days_onchart"])["Position"]
-                    .min()
-                    .reset_index()
+                datasets['cube_collab_days']["Position_min"]
+                    .reset_index(name="Position")
             )
 
             max_position_collab_artistdays = px.scatter(max_position_collab_artistdays, x="Collab_avg_days_onchart",
@@ -1694,10 +1477,8 @@ def collab_artist_on_chart(avg_or_max, data_source):
 
         elif data_source == 'Streams':
             max_streams_collab_artistdays = (
-                collab_data.drop_duplicates('Track URI2')
-                    .groupby(["Collab_avg_days_onchart"])["Streams"]
-                    .max()
-                    .reset_index()
+                datasets['cube_collab_days']["Streams_max"]
+                    .reset_index(name="Streams")
             )
 
             max_streams_collab_artistdays = px.scatter(max_streams_collab_artistdays, x="Collab_avg_days_onchart",
@@ -1717,10 +1498,8 @@ def collab_artist_on_chart(avg_or_max, data_source):
 
         elif data_source == 'Revenue':
             max_revenue_collab_artistdays = (
-                collab_data.drop_duplicates('Track URI2')
-                    .groupby(["Collab_avg_days_onchart"])["Revenue"]
-                    .max()
-                    .reset_index()
+                datasets['cube_collab_days']["Revenue_max"]
+                    .reset_index(name="Revenue")
             )
 
             max_revenue_collab_artistdays = px.scatter(max_revenue_collab_artistdays, x="Collab_avg_days_onchart",
@@ -1743,15 +1522,13 @@ def collab_artist_on_chart(avg_or_max, data_source):
 @app.callback(Output('month_day_plot', 'figure'),
               Input('month_day_value', 'value'),
               Input('month_day_data_source', 'value'))
+@memoize_callback()
 def month_week_bar_charts(month_day, data_source):
     if month_day == 'Months':
         if data_source == 'Count':
             count_month = (
-                collab_data.drop_duplicates('Track Name')
-                    .groupby(['Album_release_month'])
-                    .count()
-                    .reset_index()
-                    .rename(columns={'Track URI2': 'Count'})
+                datasets['cube_release_month']['Count']
+                    .reset_index(name='Count')
                     .sort_values(by='Album_release_month', ascending=True)
             )
 
@@ -1771,10 +1548,8 @@ def month_week_bar_charts(month_day, data_source):
 
         elif data_source == 'Position':
             position_month = (
-                collab_data.drop_duplicates('Track Name')
-                    .groupby(['Album_release_month'])['Position']
-                    .mean()
-                    .reset_index()
+                datasets['cube_release_month']['Position_mean']
+                    .reset_index(name='Position')
                     .sort_values(by='Album_release_month', ascending=True)
             )
 
@@ -1794,10 +1569,8 @@ def month_week_bar_charts(month_day, data_source):
 
         elif data_source == 'Streams':
             streams_month = (
-                collab_data.drop_duplicates('Track Name')
-                    .groupby(['Album_release_month'])['Streams']
-                    .mean()
-                    .reset_index()
+                datasets['cube_release_month']['Streams_mean']
+                    .reset_index(name='Streams')
                     .sort_values(by='Album_release_month', ascending=True)
             )
 
@@ -1817,10 +1590,8 @@ def month_week_bar_charts(month_day, data_source):
 
         elif data_source == 'Revenue':
             revenue_month = (
-                collab_data.drop_duplicates('Track Name')
-                    .groupby(['Album_release_month'])['Revenue']
-                    .mean()
-                    .reset_index()
+                datasets['cube_release_month']['Revenue_mean']
+                    .reset_index(name='Revenue')
                     .sort_values(by='Album_release_month', ascending=True)
             )
 
@@ -1841,11 +1612,8 @@ def month_week_bar_charts(month_day, data_source):
     elif month_day == "Days":
         if data_source == 'Count':
             count_days = (
-                collab_data.drop_duplicates('Track Name')
-                    .groupby(['Album_release_dayweek'])
-                    .count()
-                    .reset_index()
-                    .rename(columns={'Track URI2': 'Count'})
+                datasets['cube_release_dayweek']['Count']
+                    .reset_index(name='Count')
                     .sort_values(by='Album_release_dayweek', ascending=True)
             )
 
@@ -1865,10 +1633,8 @@ def month_week_bar_charts(month_day, data_source):
 
         elif data_source == 'Position':
             position_days = (
-                collab_data.drop_duplicates('Track Name')
-                    .groupby(['Album_release_dayweek'])['Position']
-                    .mean()
-                    .reset_index()
+                datasets['cube_release_dayweek']['Position_mean']
+                    .reset_index(name='Position')
                     .sort_values(by='Album_release_dayweek', ascending=True)
             )
 
@@ -1888,10 +1654,8 @@ def month_week_bar_charts(month_day, data_source):
 
         elif data_source == 'Streams':
             streams_days = (
-                collab_data.drop_duplicates('Track Name')
-                    .groupby(['Album_release_dayweek'])['Streams']
-                    .mean()
-                    .reset_index()
+                datasets['cube_release_dayweek']['Streams_mean']
+                    .reset_index(name='Streams')
                     .sort_values(by='Album_release_dayweek', ascending=True)
             )
 
@@ -1911,10 +1675,8 @@ def month_week_bar_charts(month_day, data_source):
 
         elif data_source == 'Revenue':
             revenue_days = (
-                collab_data.drop_duplicates('Track Name')
-                    .groupby(['Album_release_dayweek'])['Revenue']
-                    .mean()
-                    .reset_index()
+                datasets['cube_release_dayweek']['Revenue_mean']
+                    .reset_index(name='Revenue')
                     .sort_values(by='Album_release_dayweek', ascending=True)
             )
 
@@ -1936,96 +1698,67 @@ def month_week_bar_charts(month_day, data_source):
 
 
 #### Genre Network Plot
+# How edge directions are drawn: 'markers' puts one oriented arrowhead marker per edge in a
+# single trace, 'annotations' draws one layout annotation arrow per edge (much larger
+# figures, slower to render in the browser)
+NETWORK_ARROWS = os.environ.get('SPOTIFY_NETWORK_ARROWS', 'markers')
+
+# The most edges drawn, heaviest first, when a pruning mode is picked ('All Edges' draws
+# every edge)
+NETWORK_MAX_EDGES = int(os.environ.get('SPOTIFY_NETWORK_MAX_EDGES', 2000))
+
+
 @app.callback(Output('network_plot', 'figure'),
               Input('genre_network_selections', 'value'),
               Input('year_value', 'value'),
-              Input('network_data_source', 'value'))
-
-def generate_network_plotly(genres=[], year=[], metric=[]):
-    # Reduce dataframe
-    if year != []:
-        reduced_data = network_data[network_data['Year'].isin(year)][['Track URI2', 'Artist Name', 'Genre']].drop_duplicates(
-            ignore_index=True)
-    else:
-        reduced_data = network_data[['Track URI2', 'Artist Name', 'Genre']].drop_duplicates(ignore_index=True)
-
-    # Create Graph
-    digraph = nx.DiGraph()
+              Input('network_data_source', 'value'),
+              Input('network_layout', 'value'),
+              Input('network_pruning', 'value'),
+              Input('network_pruning_value', 'value'))
+@memoize_callback()
+def generate_network_plotly(genres=[], year=[], metric=[], layout='circular', pruning='all', pruning_value=None):
+    # Genre counts and edges for the selection, read from the co-occurrence matrices
+    nodes_df, edge_list_reduced = datasets['genre_network'].select(year, genres)
+
+    # Prune the edge list, then cap it so the figure stays a manageable size
+    edge_list_reduced = prune_edges(edge_list_reduced, metric, pruning, pruning_value)
+    pruned_edges = len(edge_list_reduced)
+    if pruning != 'all' and pruned_edges > NETWORK_MAX_EDGES:
+        edge_list_reduced = top_edges(edge_list_reduced, metric, NETWORK_MAX_EDGES)
 
     # Create Node List
-    nodes_df = reduced_data.groupby(['Genre'])[['Artist Name']].count().reset_index(drop=False).rename(
-        columns={'Artist Name': 'Count'})
-    nodes_df['Size'] = nodes_df['Count'].apply(lambda x: 5 * x ** (1 / 3))
-    nodes_df = nodes_df[nodes_df.Genre != 'unknown']
-    nodes_df = nodes_df[nodes_df.Genre != 'other'].reset_index(drop=False)
-
-    # Add Nodes
-    for i in range(len(nodes_df)):
-        digraph.add_node(nodes_df.Genre[i], title=nodes_df.Genre[i], count=nodes_df.Count[i], size=nodes_df.Size[i])
-
-    # Create Edge List
-    edges_df = create_edgelist(reduced_data)
-
-    edges_df = edges_df[edges_df['Artist Genre'] != edges_df['Collaborator Genre']]
-
-    for g in ['unknown', 'other']:
-        edges_df = edges_df[edges_df['Artist Genre'] != g]
-        edges_df = edges_df[edges_df['Collaborator Genre'] != g]
-
-    if genres != []:
-        a, b = edges_df[edges_df['Artist Genre'].isin(genres)], edges_df[edges_df['Collaborator Genre'].isin(genres)]
-        edges_df = pd.concat([a, b])
+    nodes_df['Size'] = 5 * nodes_df['Count'] ** (1 / 3)
 
     if metric == 'Count':
-        edge_list_reduced = edges_df.groupby(['Artist Genre', 'Collaborator Genre'])[
-            ['Artist Genre', 'Collaborator Genre']].count().rename(
-            columns={'Artist Genre': 'Count', 'Collaborator Genre': 'Weight'}).reset_index(drop=False)
-        edge_list_reduced['Weight'] = edge_list_reduced['Count'].apply(lambda x: x / (max(edge_list_reduced['Count'])))
-        edge_list_reduced['Color'] = edge_list_reduced['Weight'].apply(lambda x: plt.cm.summer(x))
         title_label = 'Genre Network Based on Counts'
 
     elif metric == 'Streams':
-        track_streams = network_data.groupby(['Track URI2'])[['Streams']].sum().reset_index(drop=False)
-        edge_list_reduced = edges_df.set_index('Track URI2').join(track_streams.set_index('Track URI2'))
-        edge_list_reduced = edge_list_reduced.groupby(['Artist Genre', 'Collaborator Genre'])[
-            ['Streams']].sum().reset_index(drop=False)
-        edge_list_reduced['Weight'] = edge_list_reduced['Streams'].apply(
-            lambda x: x / edge_list_reduced['Streams'].max())
-        edge_list_reduced['Color'] = edge_list_reduced['Weight'].apply(lambda x: plt.cm.summer(x))
         title_label = 'Genre Network Based on Cumulative Streams'
 
-    # Add Edges
-    for i in range(len(edge_list_reduced)):
-        u = edge_list_reduced['Artist Genre'][i]
-        v = edge_list_reduced['Collaborator Genre'][i]
-        color = edge_list_reduced['Color'][i]
-        m = edge_list_reduced[metric][i]
-        digraph.add_edge(u, v, color=color, metric=m)
+    if len(edge_list_reduced) < pruned_edges:
+        title_label += ' (Heaviest {:,} of {:,} Edges)'.format(len(edge_list_reduced), pruned_edges)
 
-    # Plot Graph
+    # Edge weights relative to the heaviest edge, colored along the summer colormap
+    values = edge_list_reduced[metric].to_numpy()
+    edge_list_reduced['Weight'] = values / values.max() if len(values) else values.astype(float)
+    edge_list_reduced['Color'] = hex_colors(plt.cm.summer, edge_list_reduced['Weight'])
 
-    pos = nx.circular_layout(digraph)
-
-    for node in digraph.nodes:
-        digraph.nodes[node]['pos'] = list(pos[node])
-
-    edge_x = []
-    edge_y = []
-    edge_weight = []
-    for edge in digraph.edges():
-        x0, y0 = digraph.nodes[edge[0]]['pos']
-        x1, y1 = digraph.nodes[edge[1]]['pos']
-        weight = digraph.edges[edge]['metric']
-        edge_x.append(x0)
-        edge_x.append(x1)
-        edge_x.append(None)
-        edge_y.append(y0)
-        edge_y.append(y1)
-        edge_y.append(None)
-        edge_weight.append(weight)
+    # Plot Graph
+    # (force directed layouts use the selected years' whole network, so the nodes stay put
+    # as genres are picked)
+    layout_edges = None
+    if layout != 'circular':
+        year_edges = datasets['genre_network'].select(year)[1]
+        layout_edges = zip(year_edges['Artist Genre'], year_edges['Collaborator Genre'])
+
+    pos = GRAPH_LAYOUTS.positions(layout, nodes_df['Genre'], layout_edges)
+    node_index = pd.Index(nodes_df['Genre'])
+    start = pos[node_index.get_indexer(edge_list_reduced['Artist Genre'])]
+    end = pos[node_index.get_indexer(edge_list_reduced['Collaborator Genre'])]
 
     edge_trace = go.Scatter(
-        x=edge_x, y=edge_y,
+        x=segment_coordinates(start[:, 0], end[:, 0]),
+        y=segment_coordinates(start[:, 1], end[:, 1]),
         line=dict(
             width=2,
         ),
@@ -2034,39 +1767,60 @@ def generate_network_plotly(genres=[], year=[], metric=[]):
         opacity=0.5
     )
 
-    node_x = []
-    node_y = []
-    node_size = []
-    node_label = []
-    hover_label = []
-    for node in digraph.nodes():
-        x, y = digraph.nodes[node]['pos']
-        size = digraph.nodes[node]['size']
-        n_label = '<b>' + digraph.nodes[node]['title'] + '</b>'
-        h_label = str(digraph.nodes[node]['count']) + ' artists'
-        node_x.append(x)
-        node_y.append(y)
-        node_size.append(size)
-        node_label.append(n_label)
-        hover_label.append(h_label)
-
     node_trace = go.Scatter(
-        x=node_x, y=node_y,
+        x=pos[:, 0], y=pos[:, 1],
         mode='markers+text',
         hoverinfo='text',
-        hovertext=hover_label,
-        text=node_label,
+        hovertext=nodes_df['Count'].astype(str) + ' artists',
+        text='<b>' + nodes_df['Genre'] + '</b>',
         textfont_color='#FFFFFF',
         textfont_size=12,
         marker=dict(
             showscale=False,
             color='#1DB954',
-            size=node_size,
+            size=nodes_df['Size'],
             line_width=0,
             opacity=1,
         ))
 
-    fig = go.Figure(data=[edge_trace, node_trace],
+    # Arrows from each edge's midpoint to three quarters of the way along it
+    arrow_tails = (start + end) / 2
+    arrow_heads = (end * 3 + start) / 4
+
+    if NETWORK_ARROWS == 'annotations':
+        arrow_traces = []
+        arrow_annotations = [dict(
+            ax=tail[0],
+            ay=tail[1], axref='x',
+            ayref='y',
+            x=head[0],
+            y=head[1], xref='x',
+            yref='y',
+            showarrow=True,
+            arrowhead=2,
+            arrowsize=2,
+            arrowwidth=1,
+            opacity=1,
+            arrowcolor=color,
+        )
+            for tail, head, color in zip(arrow_tails.tolist(), arrow_heads.tolist(), edge_list_reduced['Color'])]
+
+    else:
+        arrow_traces = [go.Scatter(
+            x=arrow_heads[:, 0], y=arrow_heads[:, 1],
+            mode='markers',
+            hoverinfo='none',
+            marker=dict(
+                symbol='arrow',
+                angle=arrow_angles(arrow_tails, arrow_heads),
+                color=edge_list_reduced['Color'],
+                size=12,
+                line_width=0,
+                opacity=1,
+            ))]
+        arrow_annotations = []
+
+    fig = go.Figure(data=[edge_trace] + arrow_traces + [node_trace],
                     layout=go.Layout(
                         title=title_label,
                         showlegend=False,
@@ -2075,21 +1829,7 @@ def generate_network_plotly(genres=[], year=[], metric=[]):
                         plot_bgcolor='#000000',
                         xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
                         yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
-                        annotations=[dict(
-                            ax=(digraph.nodes[edge[0]]['pos'][0] + digraph.nodes[edge[1]]['pos'][0]) / 2,
-                            ay=(digraph.nodes[edge[0]]['pos'][1] + digraph.nodes[edge[1]]['pos'][1]) / 2, axref='x',
-                            ayref='y',
-                            x=(digraph.nodes[edge[1]]['pos'][0] * 3 + digraph.nodes[edge[0]]['pos'][0]) / 4,
-                            y=(digraph.nodes[edge[1]]['pos'][1] * 3 + digraph.nodes[edge[0]]['pos'][1]) / 4, xref='x',
-                            yref='y',
-                            showarrow=True,
-                            arrowhead=2,
-                            arrowsize=2,
-                            arrowwidth=1,
-                            opacity=1,
-                            arrowcolor=mpl.colors.to_hex(digraph.edges[edge]['color']),
-                        )
-                            for edge in digraph.edges]
+                        annotations=arrow_annotations
                     ))
 
     # Add custom color bar
@@ -2138,7 +1878,85 @@ def generate_network_plotly(genres=[], year=[], metric=[]):
     return fig
 
 
+#### Artist Collaboration Network
+# Hop -> (Marker Color, Marker Size)
+EGO_NETWORK_MARKERS = {
+    0: (colors['main_color'], 30),
+    1: (colors['txt_color1'], 14),
+    2: ('#B3B3B3', 8),
+}
+
+
+@app.callback(Output('artist_network_plot', 'figure'),
+              Input('artist_network_selection', 'value'),
+              Input('artist_network_hops', 'value'))
+@memoize_callback()
+def artist_ego_network(artist=None, hops=1):
+    # The artist's collaborators (and theirs, for 2 hops), read from the adjacency slices
+    nodes_df, edges_df = datasets['artist_graph'].ego_network(artist, hops)
+
+    pos = EGO_LAYOUTS.positions('spring', nodes_df['Artist'], zip(edges_df['Artist'], edges_df['Collaborator']))
+    node_index = pd.Index(nodes_df['Artist'])
+    start = pos[node_index.get_indexer(edges_df['Artist'])]
+    end = pos[node_index.get_indexer(edges_df['Collaborator'])]
+
+    edge_trace = go.Scatter(
+        x=segment_coordinates(start[:, 0], end[:, 0]),
+        y=segment_coordinates(start[:, 1], end[:, 1]),
+        line=dict(width=1, color=colors['main_color']),
+        hoverinfo='none',
+        mode='lines',
+        opacity=0.4
+    )
+
+    markers = nodes_df['Hop'].map(EGO_NETWORK_MARKERS)
+    node_trace = go.Scatter(
+        x=pos[:, 0], y=pos[:, 1],
+        mode='markers+text',
+        hoverinfo='text',
+        hovertext=np.where(nodes_df['Hop'] == 0, nodes_df['Artist'],
+                           nodes_df['Artist'] + '<br>' + nodes_df['Tracks'].astype(str) + ' tracks together, ' +
+                           nodes_df['Streams'].map('{:,.0f}'.format) + ' streams'),
+        text=np.where(nodes_df['Hop'] <= 1, '<b>' + nodes_df['Artist'] + '</b>', ''),
+        textposition='top center',
+        textfont_color=colors['txt_color1'],
+        marker=dict(
+            color=[marker[0] for marker in markers],
+            size=[marker[1] for marker in markers],
+            line_width=0,
+            opacity=1,
+        ))
+
+    fig = go.Figure(data=[edge_trace, node_trace],
+                    layout=go.Layout(
+                        title='Collaborators of {}'.format(artist) if artist else 'Pick an Artist',
+                        showlegend=False,
+                        hovermode='closest',
+                        margin=dict(b=20, l=5, r=5, t=40),
+                        xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+                        yaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+                    ))
+
+    fig.update_layout(
+        plot_bgcolor=colors['plot_bg_color'],
+        paper_bgcolor=colors['plot_bg_color'],
+        font_color=colors['txt_color1']
+    )
+
+    return fig
+
+
+#### Callback Metrics ####
+# Times every callback registered above and serves the results at /metrics
+instrument_callbacks(app)
+add_metrics_route(app.server, CACHES)
+
+#### Chart Ingestion ####
+# Days queued with `python ingest.py add` are added to the datasets on the next request
+chart_ingest = ChartIngest(datasets)
+add_ingest_hook(app.server, chart_ingest)
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     app.run_server(debug=False, dev_tools_ui=False, dev_tools_props_check=False)
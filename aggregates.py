@@ -0,0 +1,157 @@
+#### Spotify Top 200 Aggregates ####
+
+# Pre-aggregated tables behind the bar and scatter callbacks. Each cube table holds the
+# row count and the mean/min/max of Position, Streams and Revenue for one grouping
+# dimension, so a callback reads its rows instead of grouping collab_data per request.
+
+# Importing Libraries
+import numpy as np
+import pandas as pd
+
+from caching import CACHES, CallbackCache, canonical_value
+from instrumentation import timed_phase
+
+METRICS = ['Position', 'Streams', 'Revenue']
+
+# The columns behind the Count/Position/Streams/Revenue radio buttons
+SELECTION_COLUMNS = ['Count', 'Position_mean', 'Streams_mean', 'Revenue_mean']
+
+# Cube Name -> (Source Dataset, Column Duplicates Are Dropped On, Grouping Column)
+CUBE_DIMENSIONS = {
+    'collab_tracks': ('collab_data', 'Track URI2', 'No. of Artists'),
+    'collab_names': ('collab_data', 'Track Name', 'No. of Artists'),
+    'genre': ('collab_genres', None, 'Artist Genre'),
+    'track': ('collab_data', None, 'Track Name'),
+    'artist': ('collab_data', None, 'Artist Name'),
+    'position': ('collab_data', None, 'Position'),
+    'track_days': ('collab_data', None, 'Song_days_onchart'),
+    'artist_days': ('collab_data', None, 'Artist_days_onchart'),
+    'collab_days': ('collab_data', 'Track URI2', 'Collab_avg_days_onchart'),
+    'release_month': ('collab_data', 'Track Name', 'Album_release_month'),
+    'release_dayweek': ('collab_data', 'Track Name', 'Album_release_dayweek'),
+}
+
+# Ordered categoricals keep every category (e.g. a weekday with no releases), as the
+# charts always have
+KEEP_ALL_CATEGORIES = ['Album_release_dayweek']
+
+
+# Cubes behind the default (no selection) views, each ranked once per column and direction
+# down to the longest of those views: the 15 tracks of the over time charts
+RANKED_CUBES = ['genre', 'track', 'artist']
+RANKING_SIZE = 15
+
+# Selection results by (cube, selection), so switching radio buttons on one selection
+# reuses the same frame
+SELECTION_CACHE = CACHES['selection_metrics'] = CallbackCache(maxsize=512)
+
+
+#### Building The Cube ####
+def build_cube_table(data, dedup, key):
+    if dedup is not None:
+        data = data.drop_duplicates(dedup)
+
+    grouped = data.groupby([key], observed=key not in KEEP_ALL_CATEGORIES)
+
+    table = grouped[METRICS].agg(['mean', 'min', 'max'])
+    table.columns = ['{}_{}'.format(metric, stat) for metric, stat in table.columns]
+    table.insert(0, 'Count', grouped.size())
+
+    return table
+
+
+def update_cube_table(table, data, rows, dedup, key):
+    # The cube of data plus rows, from data's cube and the groups rows add to. Counts add,
+    # means are count weighted and the extremes combine, so data is only read for dedup.
+    if dedup is not None:
+        rows = rows[~rows[dedup].isin(data[dedup].unique())]
+
+    combined = pd.concat([table, build_cube_table(rows, dedup, key)])
+    grouped = combined.groupby(level=0, sort=False, observed=True)
+
+    merged = {'Count': grouped['Count'].sum()}
+    for metric in METRICS:
+        total = (combined[metric + '_mean'].astype(float) * combined['Count']).fillna(0)
+        merged[metric + '_mean'] = total.groupby(level=0, sort=False, observed=True).sum() / merged['Count']
+        merged[metric + '_min'] = grouped[metric + '_min'].min()
+        merged[metric + '_max'] = grouped[metric + '_max'].max()
+
+    merged = pd.DataFrame(merged)[table.columns].astype(table.dtypes.to_dict())
+
+    # Groups in the order a rebuild from the updated data gives them
+    if isinstance(rows[key].dtype, pd.CategoricalDtype):
+        merged.index = pd.CategoricalIndex(merged.index, dtype=rows[key].dtype, name=key)
+    return merged.sort_index()
+
+
+def register_cube(registry):
+    for name, (source, dedup, key) in CUBE_DIMENSIONS.items():
+        registry.register('cube_' + name,
+                          lambda source=source, dedup=dedup, key=key: build_cube_table(registry[source], dedup, key))
+
+    registry.register('rankings', lambda: build_rankings(registry))
+
+
+#### Rankings ####
+def top_positions(values, n, ascending):
+    # Positions of the n smallest (or largest) values in the order a stable sort gives them:
+    # ties in table order, NaN last. Only the n picked by partitioning are sorted.
+    keys = values if ascending else -values
+    known = np.flatnonzero(~np.isnan(keys))
+
+    if n < len(known):
+        kth = np.partition(keys[known], n - 1)[n - 1]
+        below = known[keys[known] < kth]
+        known = np.concatenate([below, known[keys[known] == kth][:n - len(below)]])
+
+    ranked = known[np.lexsort((known, keys[known]))]
+    missing = np.flatnonzero(np.isnan(keys))[:n - len(ranked)]
+    return np.concatenate([ranked, missing])
+
+
+def build_rankings(registry, names=RANKED_CUBES, size=RANKING_SIZE):
+    # (Cube, Column, Ascending) -> the cube's top keys
+    rankings = {}
+    for name in names:
+        table = registry['cube_' + name]
+        for column in SELECTION_COLUMNS:
+            values = table[column].to_numpy(dtype=float)
+            for ascending in [True, False]:
+                rankings[name, column, ascending] = table.index[top_positions(values, size, ascending)]
+
+    return rankings
+
+
+@timed_phase('aggregate')
+def top_keys(registry, name, column, ascending, n):
+    if n > RANKING_SIZE:
+        table = registry['cube_' + name]
+        return table.index[top_positions(table[column].to_numpy(dtype=float), n, ascending)]
+
+    return registry['rankings'][name, column, ascending][:n]
+
+
+@timed_phase('aggregate')
+def top_rows(registry, name, column, ascending, n):
+    # The rows of the top n keys, in rank order
+    return registry['cube_' + name].loc[top_keys(registry, name, column, ascending, n)]
+
+
+def select_rows(table, values):
+    # Filtering the rows before grouping only drops groups, so a selection is a row lookup
+    if values == 'None' or values == []:
+        return table
+    return table[table.index.isin(values)]
+
+
+@timed_phase('aggregate')
+def selection_metrics(registry, name, values):
+    # Count and the mean of every metric for a selection, computed once per selection
+    key = (name, canonical_value(values))
+
+    metrics = SELECTION_CACHE.get(key)
+    if metrics is None:
+        metrics = select_rows(registry['cube_' + name], values)[SELECTION_COLUMNS]
+        SELECTION_CACHE.put(key, metrics)
+
+    return metrics
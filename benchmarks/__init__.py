@@ -0,0 +1,3 @@
+#### Spotify Top 200 Benchmarks ####
+
+# python -m benchmarks.run --scales 1 10 100      # see benchmarks/run.py
@@ -0,0 +1,86 @@
+#### Genre Network Edge List Benchmark ####
+
+# Compares the vectorized create_edgelist with the original per-row loop.
+#
+# Usage:
+#   python -m benchmarks.edgelist                             # 1e5 .. 1e7 rows
+#   python -m benchmarks.edgelist --rows 1000000 30000000 --loop-limit 1000000
+
+# Importing Libraries
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+from network import create_edgelist
+
+
+def create_edgelist_loop(data):
+    # The original implementation, kept as the reference
+    track_genre = {}
+    turi_list = list(data['Track URI2'])
+    g_list = list(data['Genre'])
+
+    for i in range(len(data)):
+        uri = turi_list[i]
+        genre = g_list[i]
+
+        if uri in track_genre:
+            track_genre[uri].append(genre)
+        else:
+            track_genre[uri] = [genre]
+
+    track_list = []
+    genre1_list = []
+    genre2_list = []
+
+    for key, values in track_genre.items():
+        for i in range(1, len(values)):
+            track_list.append(key)
+            genre1_list.append(values[0])
+            genre2_list.append(values[i])
+
+    return pd.DataFrame({'Track URI2': track_list,
+                         'Artist Genre': genre1_list,
+                         'Collaborator Genre': genre2_list})
+
+
+def network_rows(rows, rng):
+    # About five genre rows per track, tracks interleaved as in the extract
+    tracks = np.array(['track {}'.format(i) for i in range(max(rows // 5, 1))], dtype=object)
+    genres = np.array(['genre {}'.format(i) for i in range(600)], dtype=object)
+    return pd.DataFrame({'Track URI2': tracks[rng.integers(0, len(tracks), rows)],
+                         'Genre': genres[rng.integers(0, len(genres), rows)]})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark create_edgelist')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000, 10000000])
+    parser.add_argument('--loop-limit', type=int, default=1000000,
+                        help='largest size the original loop is also run (and checked) at')
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    results = []
+
+    for rows in args.rows:
+        data = network_rows(rows, rng)
+
+        start = time.perf_counter()
+        edges = create_edgelist(data)
+        result = {'rows': rows, 'edges': len(edges), 'vectorized_seconds': time.perf_counter() - start}
+
+        if rows <= args.loop_limit:
+            start = time.perf_counter()
+            expected = create_edgelist_loop(data)
+            result['loop_seconds'] = time.perf_counter() - start
+            pd.testing.assert_frame_equal(edges, expected, check_dtype=len(edges) > 0)
+
+        results.append(result)
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
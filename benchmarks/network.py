@@ -0,0 +1,69 @@
+#### Genre Network Rendering Benchmark ####
+
+# Builds the genre network figure with each arrow rendering mode on synthetic data and
+# reports server build time and figure JSON size.
+#
+# Usage:
+#   python -m benchmarks.network                              # scale 1, 5 repeats
+#   python -m benchmarks.network --scale 10 --repeat 10
+
+# Importing Libraries
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from benchmarks.run import DATA_ROOT, ROOT, load_app, prepare_data
+
+MODES = ['annotations', 'markers']
+
+
+def measure(app, mode, args, repeat):
+    from plotly.io.json import to_json_plotly
+
+    app.NETWORK_ARROWS = mode
+    func = app.generate_network_plotly.__wrapped__
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = to_json_plotly(func(*args))
+        times.append(time.perf_counter() - start)
+
+    return {'p50_seconds': float(np.percentile(times, 50)), 'figure_json_bytes': len(payload)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the genre network arrow rendering modes')
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    warnings.filterwarnings('ignore')
+    os.environ['SPOTIFY_DATA_DIR'] = os.path.join(DATA_ROOT, 'scale-{}'.format(args.scale))
+    prepare_data(args.scale)
+
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    app = load_app()
+
+    genres = list(app.datasets['network_data']['Genre'].value_counts().index[:2])
+    years = sorted(app.datasets['network_data']['Year'].unique())[:1]
+
+    for selection in [[], genres]:
+        for year in [[], years]:
+            for metric in ['Count', 'Streams']:
+                inputs = (selection, year, metric)
+                _, edges = app.datasets['genre_network'].select(year, selection)
+                result = {'args': json.loads(json.dumps(inputs, default=str)), 'edges': len(edges)}
+                for mode in MODES:
+                    result[mode] = measure(app, mode, inputs, args.repeat)
+                print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+#### Spotify Top 200 Callback Benchmarks ####
+
+# Calls every callback directly across its input space on synthetic data at each scale and
+# writes p50/p95/p99 latency, peak memory and figure JSON size to a JSON results file.
+#
+# Usage:
+#   python -m benchmarks.run                                  # scale 1, 5 repeats
+#   python -m benchmarks.run --scales 1 10 100 --repeat 10 --output bench_results.json
+#
+# Each scale runs in its own process so peak memory and lazy loads are measured cleanly.
+# Generated data is kept under benchmarks/data/scale-<n> and reused by later runs.
+
+# Importing Libraries
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+
+from benchmarks.synthetic import generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_ROOT = os.path.join(ROOT, 'benchmarks', 'data')
+
+METRICS = ['Count', 'Position', 'Streams', 'Revenue']
+ON_CHART_METRICS = ['Position', 'Streams', 'Revenue']
+
+
+#### Input Space ####
+def callback_inputs(datasets):
+    collab_data = datasets['collab_data']
+    tracks = list(collab_data['Track Name'].value_counts().index[:3])
+    artists = list(collab_data['Artist Name'].value_counts().index[:3])
+    genres = list(datasets['collab_genres']['Artist Genre'].value_counts().index[:3])
+    network_genres = list(datasets['network_data']['Genre'].value_counts().index[:2])
+    years = sorted(datasets['network_data']['Year'].unique())[:1]
+
+    return {
+        'collab_bar_charts': [(metric,) for metric in METRICS],
+        'genre_bar_charts': [(metric, selection) for metric in METRICS for selection in ['None', genres]],
+        'position_streams_charts': [('All Streams',), ('Average Streams',)],
+        'position_revenue_bar_charts': [('All Revenues',), ('Average Revenues',)],
+        'track_bar_charts': [(metric, selection) for metric in METRICS for selection in ['None', tracks]],
+        'track_revenue_over_time': [('None',), (tracks,)],
+        'top_tracks_over_time': [(metric, selection) for metric in ['Position', 'Streams']
+                                 for selection in ['None', tracks]] +
+                                [(metric, 'None', window) for metric in ['Position', 'Streams'] for window in [7, 30]],
+        'artist_bar_charts': [(metric, selection) for metric in METRICS for selection in ['None', artists]],
+        'audio_radial_graph': [('None',), (artists,)],
+        'count_days': [('Tracks',), ('Artists',)],
+        'track_on_chart': [(stat, metric) for stat in ['Average', 'Max'] for metric in ON_CHART_METRICS],
+        'artist_on_chart': [(stat, metric) for stat in ['Average', 'Max'] for metric in ON_CHART_METRICS],
+        'collab_artist_on_chart': [(stat, metric) for stat in ['Average', 'Max'] for metric in ON_CHART_METRICS],
+        'month_week_bar_charts': [(period, metric) for period in ['Months', 'Days'] for metric in METRICS],
+        'artist_ego_network': [(artists[0], hops) for hops in [1, 2]],
+        'generate_network_plotly': [(selection, year, metric) for selection in [[], network_genres]
+                                    for year in [[], years] for metric in ['Count', 'Streams']] +
+                                   [([], [], 'Count', layout) for layout in ['spring', 'spectral']],
+    }
+
+
+#### Running One Scale ####
+def load_app():
+    spec = importlib.util.spec_from_file_location('final_app', os.path.join(ROOT, 'Final App.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def measure(func, args, repeat):
+    from plotly.io.json import to_json_plotly
+
+    # First call pays for lazy loads and derived tables
+    start = time.perf_counter()
+    payload = to_json_plotly(func(*args))
+    cold = time.perf_counter() - start
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        to_json_plotly(func(*args))
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    to_json_plotly(func(*args))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'args': json.loads(json.dumps(args, default=str)),
+        'cold_seconds': cold,
+        'p50_seconds': float(np.percentile(times, 50)),
+        'p95_seconds': float(np.percentile(times, 95)),
+        'p99_seconds': float(np.percentile(times, 99)),
+        'peak_memory_bytes': peak,
+        'figure_json_bytes': len(payload),
+    }
+
+
+def run_scale(repeat, callbacks=None):
+    warnings.filterwarnings('ignore')
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+
+    start = time.perf_counter()
+    app = load_app()
+    import_seconds = time.perf_counter() - start
+
+    results = {'import_seconds': import_seconds, 'callbacks': {}}
+    for name, inputs in callback_inputs(app.datasets).items():
+        if callbacks and name not in callbacks:
+            continue
+
+        # Benchmark the callback itself, not the memoized figure
+        func = getattr(app, name)
+        func = getattr(func, '__wrapped__', func)
+        results['callbacks'][name] = [measure(func, args, repeat) for args in inputs]
+
+    results['load_seconds'] = app.datasets.load_times
+    results['peak_rss_bytes'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return results
+
+
+#### Running Every Scale ####
+def prepare_data(scale):
+    from data_store import DATASETS
+
+    data_dir = os.path.join(DATA_ROOT, 'scale-{}'.format(scale))
+    if not all(os.path.exists(os.path.join(data_dir, name + '.csv')) for name in DATASETS.values()):
+        print('Generating scale {} data in {}'.format(scale, data_dir), file=sys.stderr)
+        generate(scale, data_dir)
+
+    return data_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Spotify Top 200 callbacks')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--callbacks', nargs='*', help='only benchmark these callbacks')
+    parser.add_argument('--csv', action='store_true',
+                        help='load from CSV instead of converting to the Arrow store first')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        json.dump(run_scale(args.repeat, args.callbacks), sys.stdout)
+        return
+
+    sys.path.insert(0, ROOT)
+    results = {'repeat': args.repeat, 'scales': {}}
+
+    for scale in args.scales:
+        data_dir = prepare_data(scale)
+        env = dict(os.environ, SPOTIFY_DATA_DIR=data_dir, SPOTIFY_STORE_DIR=os.path.join(data_dir, 'store'))
+
+        if not args.csv:
+            subprocess.run([sys.executable, os.path.join(ROOT, 'data_store.py'), 'convert'],
+                           env=env, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+
+        command = [sys.executable, '-m', 'benchmarks.run', '--worker', '--repeat', str(args.repeat)]
+        if args.callbacks:
+            command += ['--callbacks'] + args.callbacks
+
+        print('Benchmarking scale {}'.format(scale), file=sys.stderr)
+        worker = subprocess.run(command, env=env, cwd=ROOT, check=True, stdout=subprocess.PIPE)
+        results['scales'][str(scale)] = json.loads(worker.stdout)
+
+    with open(args.output, 'w') as output:
+        json.dump(results, output, indent=2)
+
+    print('Wrote {}'.format(args.output), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#### Synthetic Spotify Top 200 Data ####
+
+# Generates datasets with the same schemas as the four files in ./data, at a multiple of
+# the 2017 - 2020 US chart size. A scale of n behaves like n countries' charts over the
+# same dates: n times the rows, tracks and artists.
+#
+# Usage:
+#   python -m benchmarks.synthetic --scale 10 --output ./benchmarks/data/scale-10
+
+# Importing Libraries
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Size of the real US extract (scale 1)
+DAYS = pd.date_range('2017-01-01', '2020-12-31')
+TRACKS_PER_SCALE = 1000
+ARTISTS_PER_SCALE = 1600
+GENRES = 600
+MEAN_DAYS_ON_CHART = 110
+CHART_SIZE = 200
+REVENUE_PER_STREAM = 0.00331
+
+DAYWEEKS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+AUDIO_FEATURES = ['Average Danceability', 'Average Energy', 'Average Speechiness',
+                  'Average Acousticness', 'Average Instrumentalness', 'Average Liveness']
+
+# Artists the app shows by default
+DEFAULT_ARTISTS = ['Drake', 'Post Malone', 'Travis Scott', 'Khalid', 'Juice WRLD']
+
+
+#### Catalog ####
+def make_catalog(scale, rng):
+    n_artists = ARTISTS_PER_SCALE * scale
+    n_tracks = TRACKS_PER_SCALE * scale
+
+    artist_names = np.array(DEFAULT_ARTISTS + ['Artist {}'.format(i) for i in range(n_artists - len(DEFAULT_ARTISTS))],
+                            dtype=object)
+    genre_names = np.array(['genre {}'.format(i) for i in range(GENRES - 2)] + ['unknown', 'other'], dtype=object)
+
+    # A few popular genres and artists, and a long tail
+    genre_weights = 1 / np.arange(1, GENRES + 1)
+    artist_genres = [list(genre_names[rng.choice(GENRES, rng.integers(1, 5), replace=False,
+                                                 p=genre_weights / genre_weights.sum())])
+                     for _ in range(n_artists)]
+
+    artist_weights = 1 / np.arange(1, n_artists + 1) ** 0.7
+    track_artists = [rng.choice(n_artists, 2 + rng.geometric(0.6) - 1, replace=False,
+                                p=artist_weights / artist_weights.sum())
+                     for _ in range(n_tracks)]
+
+    tracks = pd.DataFrame({
+        'Track Name': ['Track {}'.format(i) for i in range(n_tracks)],
+        'Start': rng.integers(-MEAN_DAYS_ON_CHART, len(DAYS), n_tracks),
+        'Length': rng.geometric(1 / MEAN_DAYS_ON_CHART, n_tracks),
+        'Popularity': rng.lognormal(12.5, 0.5, n_tracks),
+        'Album_release_month': rng.integers(1, 13, n_tracks),
+        'Album_release_dayweek': rng.choice(DAYWEEKS, n_tracks, p=[.1, .1, .1, .1, .35, .15, .1]),
+    })
+    tracks['Artists'] = track_artists
+    tracks['Track URI2'] = [name + str(list(artist_names[artists]))
+                            for name, artists in zip(tracks['Track Name'], track_artists)]
+
+    return tracks, artist_names, artist_genres
+
+
+#### Datasets ####
+def make_collab_data(scale, rng):
+    tracks, artist_names, artist_genres = make_catalog(scale, rng)
+
+    # One row per track per day it is on a chart
+    track_ids = np.repeat(np.arange(len(tracks)), tracks['Length'])
+    day_ids = tracks['Start'].to_numpy()[track_ids] + (
+        np.arange(len(track_ids)) - np.repeat(np.cumsum(tracks['Length']) - tracks['Length'], tracks['Length']))
+    keep = (day_ids >= 0) & (day_ids < len(DAYS))
+    track_ids, day_ids = track_ids[keep], day_ids[keep]
+
+    # Streams decay over a run; each of the `scale` charts ranks its own tracks
+    age = day_ids - tracks['Start'].to_numpy()[track_ids]
+    streams = (tracks['Popularity'].to_numpy()[track_ids] * np.exp(-age / 200)
+               * rng.lognormal(0, 0.1, len(track_ids))).astype(np.int64) + 1000
+    chart_days = pd.DataFrame({'track': track_ids, 'day': day_ids,
+                               'chart': track_ids % scale, 'Streams': streams})
+    chart_days['Position'] = (chart_days.groupby(['chart', 'day'])['Streams']
+                              .rank(method='first', ascending=False).astype(np.int64))
+    chart_days = chart_days[chart_days['Position'] <= CHART_SIZE].sort_values(['day', 'chart', 'Position'])
+    chart_days['Song_days_onchart'] = chart_days.groupby('track').cumcount() + 1
+
+    # Long format: one row per credited artist
+    artists = tracks['Artists'].to_numpy()
+    n_artists = np.array([len(a) for a in artists])
+    rows = np.repeat(np.arange(len(chart_days)), n_artists[chart_days['track']])
+    data = chart_days.iloc[rows].reset_index(drop=True)
+    data['Artist No.'] = data.groupby(rows).cumcount() + 1
+    first_artist = np.cumsum(n_artists) - n_artists
+    artist_ids = np.concatenate(artists)[first_artist[data['track']] + data['Artist No.'] - 1]
+
+    catalog = tracks.iloc[data['track']].reset_index(drop=True)
+    data['Date'] = DAYS[data['day']].strftime('%Y-%m-%d')
+    data['Track Name'] = catalog['Track Name']
+    data['Artist Name'] = artist_names[artist_ids]
+    data['No. of Artists'] = n_artists[data['track']]
+    data['Artist Genre'] = [str(artist_genres[a]) for a in artist_ids]
+    data['Track URI2'] = catalog['Track URI2']
+    data['Album_release_month'] = catalog['Album_release_month']
+    data['Album_release_dayweek'] = catalog['Album_release_dayweek']
+    data['Artist_days_onchart'] = data.groupby('Artist Name')['day'].rank(method='dense').astype(np.int64)
+    data['Collab_avg_days_onchart'] = data.groupby(['Track URI2', 'day'])['Artist_days_onchart'].transform('mean')
+    data['Revenue'] = data['Streams'] * REVENUE_PER_STREAM
+
+    columns = ['Date', 'Track Name', 'Streams', 'Position', 'Artist Name', 'Artist No.', 'No. of Artists',
+               'Artist Genre', 'Track URI2', 'Album_release_month', 'Album_release_dayweek',
+               'Song_days_onchart', 'Artist_days_onchart', 'Collab_avg_days_onchart', 'Revenue']
+    return data[columns], artist_genres, artist_names
+
+
+def make_genre_data(collab_data):
+    # Same shape as the notebook's explode of the 'Artist Genre' lists
+    genres = collab_data[['Artist Name', 'Position', 'Streams', 'Revenue', 'Artist Genre']].copy()
+    genres['Artist Genre'] = (genres['Artist Genre'].str.strip('[]').str.replace("'", '')
+                              .str.split(', '))
+    genres = genres.explode('Artist Genre')
+    return genres[genres['Artist Genre'] != '']
+
+
+def make_network_data(collab_data, artist_genres, artist_names):
+    # One row per track, artist, genre and year, with the track's streams in that year
+    yearly = (collab_data.assign(Year=collab_data['Date'].str[:4].astype(int))
+              .groupby(['Track URI2', 'Artist Name', 'Year'], observed=True)['Streams'].sum()
+              .reset_index())
+    genres_by_artist = dict(zip(artist_names, artist_genres))
+    yearly['Genre'] = yearly['Artist Name'].map(genres_by_artist)
+    return yearly.explode('Genre')[['Track URI2', 'Artist Name', 'Genre', 'Year', 'Streams']]
+
+
+def make_features_data(artist_names, rng):
+    features = pd.DataFrame({
+        'Artist Name': np.repeat(artist_names, len(AUDIO_FEATURES)),
+        'variable': np.tile(AUDIO_FEATURES, len(artist_names)),
+        'value': rng.beta(2, 3, len(artist_names) * len(AUDIO_FEATURES)),
+    })
+    return features
+
+
+def generate(scale, output, seed=0):
+    rng = np.random.default_rng(seed)
+    os.makedirs(output, exist_ok=True)
+
+    collab_data, artist_genres, artist_names = make_collab_data(scale, rng)
+    collab_data.to_csv(os.path.join(output, 'US_Spotify_Data.csv'))
+    make_genre_data(collab_data).to_csv(os.path.join(output, 'US_Spotify_Genre_Data.csv'))
+    make_network_data(collab_data, artist_genres, artist_names).to_csv(os.path.join(output, 'Genre_Network_Data.csv'))
+    make_features_data(artist_names, rng).to_csv(os.path.join(output, 'US_Spotify_Audio_Features_Working_Data.csv'))
+
+    return output
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic Spotify Top 200 datasets')
+    parser.add_argument('--scale', type=int, default=1)
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(generate(args.scale, args.output, args.seed))
@@ -0,0 +1,114 @@
+#### Spotify Top 200 Callback Cache ####
+
+# Memoizes callback figures by their input values. Most callbacks only have a handful
+# of possible inputs, so repeated tab switches are served from the serialized figure
+# instead of re-running pandas and Plotly.
+
+# Importing Libraries
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from plotly.io.json import to_json_plotly
+
+from instrumentation import phase
+
+DEFAULT_MAXSIZE = 256
+DEFAULT_TTL = 60 * 60
+
+# Every memoized callback by name, for reporting and clearing
+CACHES = {}
+
+
+#### Input Keys ####
+def canonical_value(value):
+    # The dropdowns start at 'None' and clear to [], which the callbacks treat the same;
+    # multi-select order does not change the figure
+    if value is None or value == 'None' or value == []:
+        return None
+    if isinstance(value, (list, tuple)):
+        return tuple(sorted(value, key=str))
+    if isinstance(value, dict):
+        return json.dumps(value, sort_keys=True)
+    return value
+
+
+#### LRU Cache ####
+class CallbackCache:
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if self.ttl is None or expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+                del self._entries[key]
+                self.evictions += 1
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (self.ttl or 0), value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._entries), 'maxsize': self.maxsize}
+
+
+#### Decorator ####
+def memoize_callback(maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+    def decorator(func):
+        cache = CallbackCache(maxsize, ttl)
+        CACHES[func.__name__] = cache
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = tuple(canonical_value(arg) for arg in args)
+
+            # The figure is kept as its JSON text: compact, and callers can never mutate
+            # the cached copy
+            cached = cache.get(key)
+            if cached is None:
+                with phase('compute'):
+                    figure = func(*args)
+                cached = to_json_plotly(figure)
+                cache.put(key, cached)
+                return json.loads(cached)
+
+            with phase('cache'):
+                return json.loads(cached)
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+def clear_caches():
+    for cache in CACHES.values():
+        cache.clear()
@@ -0,0 +1,189 @@
+#### Spotify Top 200 Artist Collaboration Graph ####
+
+# Artist x artist graph of who has charted on a track together, built from network_data.
+# The adjacency is kept as CSR arrays (artist i's collaborators are
+# indices[indptr[i]:indptr[i + 1]]) with the number of shared tracks and their summed
+# streams per edge. The arrays are saved as .npy files and memory mapped on load, so an
+# ego network query only reads the slices of the artists in it.
+
+# Importing Libraries
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_store import STORE_DIR, dataset_mtime
+from instrumentation import timed_phase
+
+ARTIST_GRAPH_DIR = os.environ.get('SPOTIFY_ARTIST_GRAPH_DIR', os.path.join(STORE_DIR, 'artist_graph'))
+ARTIST_GRAPH_ARRAYS = ['artists', 'indptr', 'indices', 'tracks', 'streams']
+
+logger = logging.getLogger(__name__)
+
+
+#### Building ####
+def build_artist_graph(network_data, track_streams):
+    members = network_data[['Track URI2', 'Artist Name']].dropna().drop_duplicates()
+    artist_codes, artists = pd.factorize(members['Artist Name'], sort=True)
+    members = pd.DataFrame({'Track': track_streams.codes(members['Track URI2']), 'Artist': artist_codes})
+
+    # Every ordered pair of artists on the same track, summed over tracks
+    links = members.merge(members, on='Track', suffixes=('', ' Collaborator'))
+    links = links[links['Artist'] != links['Artist Collaborator']]
+    links = links.assign(Streams=track_streams.total[links['Track']])
+    links = links.groupby(['Artist', 'Artist Collaborator']).agg(Tracks=('Track', 'size'), Streams=('Streams', 'sum'))
+
+    rows = links.index.get_level_values('Artist').to_numpy()
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(artists)))])
+
+    return {
+        'artists': np.asarray(artists, dtype=str),
+        'indptr': indptr.astype(np.int64),
+        'indices': links.index.get_level_values('Artist Collaborator').to_numpy().astype(np.int32),
+        'tracks': links['Tracks'].to_numpy().astype(np.int32),
+        'streams': links['Streams'].to_numpy(),
+    }
+
+
+#### Storing ####
+# Each save writes its arrays to a new generation directory, then points the 'current' file
+# at it with one rename. Concurrent saves never share a file, and a reader always maps the
+# arrays of a single generation.
+GRAPH_POINTER = 'current'
+GRAPH_GENERATION_GRACE = 10 * 60
+
+
+def graph_path(directory, name):
+    return os.path.join(directory, name + '.npy')
+
+
+def current_generation(directory):
+    # The generation directory of the last completed save, or None
+    try:
+        with open(os.path.join(directory, GRAPH_POINTER)) as pointer:
+            return os.path.join(directory, pointer.read().strip())
+    except OSError:
+        return None
+
+
+def graph_is_current(directory):
+    # Rebuilt whenever network_data has changed since the arrays were written
+    pointer = os.path.join(directory, GRAPH_POINTER)
+    if not os.path.exists(pointer):
+        return False
+    return os.path.getmtime(pointer) >= dataset_mtime('network_data')
+
+
+def save_artist_graph(arrays, directory=ARTIST_GRAPH_DIR):
+    os.makedirs(directory, exist_ok=True)
+
+    generation = tempfile.mkdtemp(prefix='graph-', dir=directory)
+    for name in ARTIST_GRAPH_ARRAYS:
+        np.save(graph_path(generation, name), arrays[name])
+
+    handle, pointer = tempfile.mkstemp(prefix='.' + GRAPH_POINTER + '-', dir=directory)
+    with os.fdopen(handle, 'w') as output:
+        output.write(os.path.basename(generation))
+    os.replace(pointer, os.path.join(directory, GRAPH_POINTER))
+
+    remove_old_generations(directory)
+
+
+def remove_old_generations(directory, grace=GRAPH_GENERATION_GRACE):
+    # Generations other than the current one are removed once untouched for the grace
+    # period, so a save still writing one, or a reader about to map one, is never cut short.
+    # Mapped arrays of a removed generation stay readable until unmapped.
+    current = current_generation(directory)
+    cutoff = time.time() - grace
+    for name in os.listdir(directory):
+        generation = os.path.join(directory, name)
+        if not name.startswith('graph-') or generation == current:
+            continue
+        try:
+            if os.path.getmtime(generation) < cutoff:
+                shutil.rmtree(generation, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def load_artist_graph(directory=ARTIST_GRAPH_DIR):
+    generation = current_generation(directory)
+    return {name: np.load(graph_path(generation, name), mmap_mode='r') for name in ARTIST_GRAPH_ARRAYS}
+
+
+#### Ego Networks ####
+class ArtistGraph:
+    def __init__(self, arrays):
+        self.artists = pd.Index(np.asarray(arrays['artists']).astype(object))
+        self.indptr = arrays['indptr']
+        self.indices = arrays['indices']
+        self.tracks = arrays['tracks']
+        self.streams = arrays['streams']
+
+    def degrees(self):
+        return pd.Series(np.diff(self.indptr), index=self.artists)
+
+    def most_connected(self):
+        # The artist with the most collaborators, or None for an empty graph
+        degrees = self.degrees()
+        return degrees.idxmax() if len(degrees) else None
+
+    def rows(self, codes):
+        # Positions of every adjacency entry of the given artists, and whose entry each is
+        starts = self.indptr[codes]
+        lengths = self.indptr[np.asarray(codes) + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return offsets + np.arange(lengths.sum()), np.repeat(codes, lengths)
+
+    @timed_phase('aggregate')
+    def ego_network(self, artist, hops=1):
+        # The artist, everyone within the given number of hops, and the edges between them
+        codes = self.artists.get_indexer([artist])
+        codes = codes[codes >= 0]
+        hop = np.zeros(len(codes), dtype=int)
+
+        frontier = codes
+        for distance in range(1, hops + 1 if len(codes) else 1):
+            positions, _ = self.rows(frontier)
+            frontier = np.setdiff1d(self.indices[positions], codes)
+            codes = np.concatenate([codes, frontier])
+            hop = np.concatenate([hop, np.full(len(frontier), distance)])
+
+        # Each edge once, between two artists in the neighbourhood
+        positions, sources = self.rows(codes)
+        targets = np.asarray(self.indices[positions])
+        keep = np.isin(targets, codes) & (sources < targets)
+
+        # Shared tracks and streams with the artist, from the artist's own row
+        own, _ = self.rows(codes[:1])
+        with_artist = pd.DataFrame({'Tracks': self.tracks[own], 'Streams': self.streams[own]},
+                                   index=np.asarray(self.indices[own]))
+        with_artist = with_artist.reindex(codes, fill_value=0)
+
+        nodes = pd.DataFrame({'Artist': self.artists[codes], 'Hop': hop,
+                              'Tracks': with_artist['Tracks'].to_numpy(),
+                              'Streams': with_artist['Streams'].to_numpy()})
+        edges = pd.DataFrame({'Artist': self.artists[sources[keep]], 'Collaborator': self.artists[targets[keep]],
+                              'Tracks': self.tracks[positions[keep]], 'Streams': self.streams[positions[keep]]})
+
+        return nodes, edges
+
+
+def open_artist_graph(registry, directory=ARTIST_GRAPH_DIR):
+    if not graph_is_current(directory):
+        arrays = build_artist_graph(registry['network_data'], registry['track_streams'])
+        try:
+            save_artist_graph(arrays, directory)
+        except OSError as error:
+            logger.warning('Could not save the artist graph to %s: %s', directory, error)
+            return ArtistGraph(arrays)
+
+    return ArtistGraph(load_artist_graph(directory))
+
+
+def register_collaboration(registry):
+    registry.register('artist_graph', lambda: open_artist_graph(registry))
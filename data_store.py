@@ -0,0 +1,272 @@
+#### Spotify Top 200 Data Store ####
+
+# Converts the CSV extracts into typed Arrow IPC (Feather) files once, so the app
+# can load them at start up without re-parsing text.
+#
+# Usage:
+#   python data_store.py convert                      # convert every dataset
+#   python data_store.py convert collab_data          # convert selected datasets
+#   python data_store.py memory                       # per column memory before/after compaction
+
+# Importing Libraries
+import argparse
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from instrumentation import phase
+
+# Setting Locations
+DATA_DIR = os.environ.get('SPOTIFY_DATA_DIR', './data')
+STORE_DIR = os.environ.get('SPOTIFY_STORE_DIR', os.path.join(DATA_DIR, 'store'))
+
+# Chart days appended since the datasets were written (see ingest.py)
+INGEST_DIR = os.environ.get('SPOTIFY_INGEST_DIR', os.path.join(STORE_DIR, 'ingest'))
+
+# Dataset Name -> Source File (without extension)
+DATASETS = {
+    'collab_data': 'US_Spotify_Data',
+    'collab_genres': 'US_Spotify_Genre_Data',
+    'collab_features_data': 'US_Spotify_Audio_Features_Working_Data',
+    'network_data': 'Genre_Network_Data',
+}
+
+# Datasets the ingested chart days are added to
+INGESTED_DATASETS = ['collab_data', 'collab_genres', 'network_data']
+
+DAYWEEK_CATEGORIES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# Compaction: string columns stored as dictionary encoded categoricals, and the
+# integer widths each numeric column is narrowed to
+CATEGORY_COLUMNS = {
+    'collab_data': ['Track Name', 'Artist Name', 'Track URI2', 'Artist Genre'],
+    'collab_genres': ['Artist Name', 'Artist Genre'],
+}
+
+INTEGER_WIDTHS = {
+    'Unnamed: 0': 'int32',
+    'Position': 'int16',
+    'Streams': 'int32',
+    'Artist No.': 'int16',
+    'No. of Artists': 'int16',
+    'Album_release_month': 'int16',
+    'Song_days_onchart': 'int32',
+    'Artist_days_onchart': 'int32',
+}
+
+FLOAT32_TOLERANCE = 1e-6
+
+logger = logging.getLogger(__name__)
+
+
+#### Paths ####
+def csv_path(name):
+    return os.path.join(DATA_DIR, DATASETS[name] + '.csv')
+
+
+def store_path(name):
+    return os.path.join(STORE_DIR, DATASETS[name] + '.feather')
+
+
+def store_is_current(name):
+    # The store is only used while it is at least as new as the CSV it was built from
+    path = store_path(name)
+    if not os.path.exists(path):
+        return False
+    if not os.path.exists(csv_path(name)):
+        return True
+    return os.path.getmtime(path) >= os.path.getmtime(csv_path(name))
+
+
+def dataset_mtime(name):
+    # When the data a dataset loads from last changed, for files derived from it
+    path = store_path(name) if store_is_current(name) else csv_path(name)
+    mtime = os.path.getmtime(path)
+
+    # Ingested days change the data without touching its files
+    if name in INGESTED_DATASETS and os.path.isdir(INGEST_DIR):
+        mtime = max(mtime, os.path.getmtime(INGEST_DIR))
+
+    return mtime
+
+
+#### Reading ####
+def clean_dataset(name, data):
+    # Cleaning Up Some Columns
+    if name == 'collab_data':
+        data['Date'] = pd.to_datetime(data['Date'])
+        data['Album_release_dayweek'] = pd.Categorical(data['Album_release_dayweek'],
+                                                       categories=DAYWEEK_CATEGORIES,
+                                                       ordered=True)
+    return data
+
+
+#### Compaction ####
+def compact_column(column, name):
+    if name in INTEGER_WIDTHS and pd.api.types.is_numeric_dtype(column) and column.notna().all():
+        width = np.iinfo(INTEGER_WIDTHS[name])
+        if (column % 1 == 0).all() and column.min() >= width.min and column.max() <= width.max:
+            return column.astype(INTEGER_WIDTHS[name])
+
+    # Only narrow floats whose values survive the round trip through float32
+    if pd.api.types.is_float_dtype(column) and column.dtype != np.float32:
+        narrowed = column.astype(np.float32)
+        if np.allclose(column, narrowed, rtol=FLOAT32_TOLERANCE, atol=0, equal_nan=True):
+            return narrowed
+
+    return column
+
+
+def compact_dataset(name, data):
+    before = data.memory_usage(index=False, deep=True)
+
+    for column in data.columns:
+        if column in CATEGORY_COLUMNS[name]:
+            data[column] = data[column].astype('category')
+        else:
+            data[column] = compact_column(data[column], column)
+
+    after = data.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({'Before': before, 'After': after, 'Dtype': data.dtypes.astype(str)})
+
+    return data, report
+
+
+def read_csv_dataset(name):
+    data = clean_dataset(name, pd.read_csv(csv_path(name)))
+
+    if name in CATEGORY_COLUMNS:
+        data, report = compact_dataset(name, data)
+        logger.info('Compacted %s from %.1f MB to %.1f MB', name,
+                    report['Before'].sum() / 1e6, report['After'].sum() / 1e6)
+
+    return data
+
+
+def read_store_dataset(name):
+    # The file is memory mapped rather than read into a buffer first, but pandas still copies
+    # every column into its own arrays. One block per column, each Arrow buffer released once
+    # converted, keeps the load's peak near the frame's size instead of several times it.
+    table = feather.read_table(store_path(name), memory_map=True)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def load_dataset(name):
+    if store_is_current(name):
+        return read_store_dataset(name)
+    return read_csv_dataset(name)
+
+
+#### Lazy Registry ####
+# Loads each dataset the first time it is asked for, so a worker only pays for the
+# tables behind the tabs it actually serves.
+class DatasetRegistry:
+    def __init__(self, loader=load_dataset):
+        self._loaders = {name: (lambda name=name: loader(name)) for name in DATASETS}
+        self._data = {}
+        self._locks = {name: threading.Lock() for name in self._loaders}
+        self.load_times = {}
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def register(self, name, builder):
+        # Derived tables (cubes, networks, series) are built from other entries on first use
+        # and cached like any dataset
+        self._loaders[name] = builder
+        self._locks[name] = threading.Lock()
+
+    def get(self, name):
+        try:
+            return self._data[name]
+        except KeyError:
+            pass
+
+        # One lock per dataset: concurrent requests for the same table wait for a single
+        # load, while other tables can load in parallel
+        with self._locks[name]:
+            if name not in self._data:
+                start = time.perf_counter()
+                with phase('load'):
+                    self._data[name] = self._loaders[name]()
+                self.load_times[name] = time.perf_counter() - start
+                logger.info('Loaded %s in %.3fs', name, self.load_times[name])
+
+        return self._data[name]
+
+    def is_loaded(self, name):
+        return name in self._data
+
+    def loaded(self):
+        return list(self._data)
+
+    def put(self, name, value):
+        # Swaps in an updated table, e.g. after new chart days are ingested
+        with self._locks[name]:
+            self._data[name] = value
+
+    def invalidate(self, names):
+        # Dropped tables are rebuilt from the current data the next time they are asked for
+        for name in names:
+            with self._locks[name]:
+                self._data.pop(name, None)
+
+    def preload(self, names=None):
+        for name in names or list(self._loaders):
+            self.get(name)
+
+
+#### Converting ####
+def convert_dataset(name):
+    data = read_csv_dataset(name)
+    return write_store_dataset(name, data)
+
+
+def write_store_dataset(name, data):
+    os.makedirs(STORE_DIR, exist_ok=True)
+
+    # Write to a temporary file first so a running app never reads a half written store
+    path = store_path(name)
+    feather.write_feather(data, path + '.tmp', compression='uncompressed')
+    os.replace(path + '.tmp', path)
+
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Spotify Top 200 data store')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    convert = commands.add_parser('convert', help='convert the CSV datasets to Arrow IPC files')
+    convert.add_argument('datasets', nargs='*',
+                         help='datasets to convert, any of: {} (default: all)'.format(', '.join(DATASETS)))
+
+    commands.add_parser('memory', help='report per column memory before and after compaction')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'convert':
+        unknown = [name for name in args.datasets if name not in DATASETS]
+        if unknown:
+            parser.error('unknown datasets: {}'.format(', '.join(unknown)))
+
+        for name in args.datasets or list(DATASETS):
+            print('{} -> {}'.format(csv_path(name), convert_dataset(name)))
+
+    elif args.command == 'memory':
+        for name in CATEGORY_COLUMNS:
+            data = clean_dataset(name, pd.read_csv(csv_path(name)))
+            _, report = compact_dataset(name, data)
+            report.loc['Total'] = [report['Before'].sum(), report['After'].sum(), '']
+            print('#### {} ####'.format(name))
+            print(report.to_string())
+            print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#### Spotify Top 200 Position Density ####
+
+# Chart position x metric histograms behind the All Streams and All Revenues charts. Up to
+# SCATTER_WEBGL_ROWS rows are drawn as an SVG scatter and up to SCATTER_DENSITY_ROWS as a
+# WebGL scatter. Past that, the rows are binned once at load (one bin per chart position
+# by log spaced metric bins) and drawn as a heatmap, whose size no longer grows with the data.
+
+# Importing Libraries
+import os
+
+import numpy as np
+
+from instrumentation import timed_phase
+
+SCATTER_WEBGL_ROWS = int(os.environ.get('SPOTIFY_SCATTER_WEBGL_ROWS', 1000))
+SCATTER_DENSITY_ROWS = int(os.environ.get('SPOTIFY_SCATTER_DENSITY_ROWS', 100000))
+
+DENSITY_METRICS = ['Streams', 'Revenue']
+DENSITY_BINS = int(os.environ.get('SPOTIFY_DENSITY_BINS', 100))
+
+
+def scatter_mode(rows):
+    if rows > SCATTER_DENSITY_ROWS:
+        return 'density'
+    if rows > SCATTER_WEBGL_ROWS:
+        return 'webgl'
+    return 'svg'
+
+
+#### Density Grids ####
+def log_edges(values, bins):
+    # Log spaced bin edges over the positive values (a log axis can't show the rest)
+    if not len(values):
+        return np.geomspace(1, 10, bins + 1)
+
+    low, high = values.min(), values.max()
+    return np.geomspace(low, high if high > low else low * 2, bins + 1)
+
+
+class PositionDensity:
+    def __init__(self, data, metrics=DENSITY_METRICS, bins=DENSITY_BINS):
+        positions = data['Position'].to_numpy(dtype=float)
+        known = ~np.isnan(positions)
+
+        # One bin per chart position
+        first, last = (positions[known].min(), positions[known].max()) if known.any() else (1, 1)
+        self.position_edges = np.arange(first, last + 2) - 0.5
+        self.rows = len(data)
+
+        # Metric -> (metric bin edges, metric bins x positions counts)
+        self.grids = {}
+        for metric in metrics:
+            values = data[metric].to_numpy(dtype=float)
+            keep = known & (values > 0)
+
+            edges = log_edges(values[keep], bins)
+            counts = np.histogram2d(values[keep], positions[keep], bins=[edges, self.position_edges])[0]
+            self.grids[metric] = (edges, counts.astype(np.int64))
+
+    @timed_phase('aggregate')
+    def grid(self, metric):
+        edges, counts = self.grids[metric]
+        return self.position_edges, edges, counts
+
+
+def register_density(registry):
+    registry.register('position_density', lambda: PositionDensity(registry['collab_data']))
@@ -0,0 +1,304 @@
+#### Spotify Top 200 Daily Ingestion ####
+
+# Appends new chart days to the datasets without a restart or a full rebuild.
+#
+# Usage:
+#   python ingest.py add days.csv [more.csv]      # queue new days for the running app
+#   python ingest.py compact                      # fold the queued days into the Arrow store
+#
+# `add` takes rows with the columns of US_Spotify_Data.csv, minus the derived ones
+# (Song_days_onchart, Artist_days_onchart, Collab_avg_days_onchart and Revenue), for days
+# after the latest one charted. The rows are written to the ingest directory, and every app
+# process applies them on its next request: the derived columns are worked out from the
+# affected tracks' and artists' days so far, the loaded cubes are updated in place, and the
+# other derived tables are rebuilt on their next use. `compact` should be run while the app
+# is stopped (or restarted afterwards), as it empties the ingest directory.
+#
+# Applying a day copies collab_data, collab_genres and network_data once. Under serve.py's
+# preloaded gunicorn master that happens once in the master, which then replaces its workers
+# so they share the updated tables copy-on-write; any other process applies the days itself
+# and so holds its own copy of those tables afterwards.
+
+# Importing Libraries
+import argparse
+import logging
+import os
+import signal
+import threading
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from aggregates import CUBE_DIMENSIONS, update_cube_table
+from caching import clear_caches
+from data_store import DATASETS, INGEST_DIR, INGESTED_DATASETS, DatasetRegistry, write_store_dataset
+
+# The columns each new chart row must have
+CHART_COLUMNS = ['Date', 'Track Name', 'Streams', 'Position', 'Artist Name', 'Artist No.', 'No. of Artists',
+                 'Artist Genre', 'Track URI2', 'Album_release_month', 'Album_release_dayweek']
+
+REVENUE_PER_STREAM = float(os.environ.get('SPOTIFY_REVENUE_PER_STREAM', 0.00331))
+
+# The row number column left over from writing the CSVs with their index
+INDEX_COLUMN = 'Unnamed: 0'
+
+# Marks a batch of queued files a worker has asked the master to apply
+RELOAD_SUFFIX = '.reload'
+
+logger = logging.getLogger(__name__)
+
+
+#### Derived Columns ####
+def days_on_chart(data, rows, key, column):
+    # Days on the chart before these rows (0 for newcomers) plus the rank of each new day
+    seen = data[data[key].isin(rows[key].unique())]
+    previous = seen.groupby(key, observed=True)[column].max().to_dict()
+
+    start = rows[key].map(previous).fillna(0)
+    return (start + rows.groupby(key)['Date'].rank(method='dense')).astype(np.int64)
+
+
+def derive_columns(collab_data, rows):
+    missing = [column for column in CHART_COLUMNS if column not in rows.columns]
+    if missing:
+        raise ValueError('missing chart columns: {}'.format(', '.join(missing)))
+
+    rows = rows[CHART_COLUMNS].reset_index(drop=True)
+    rows['Date'] = pd.to_datetime(rows['Date'])
+
+    latest = collab_data['Date'].max()
+    if (rows['Date'] <= latest).any():
+        raise ValueError('only days after {:%Y-%m-%d} can be added'.format(latest))
+
+    rows['Song_days_onchart'] = days_on_chart(collab_data, rows, 'Track URI2', 'Song_days_onchart')
+    rows['Artist_days_onchart'] = days_on_chart(collab_data, rows, 'Artist Name', 'Artist_days_onchart')
+    rows['Collab_avg_days_onchart'] = rows.groupby(['Track URI2', 'Date'])['Artist_days_onchart'].transform('mean')
+    rows['Revenue'] = rows['Streams'] * REVENUE_PER_STREAM
+
+    return rows
+
+
+def artist_genres(rows):
+    # The 'Artist Genre' lists ("['pop', 'rap']") as one genre per row
+    genres = rows['Artist Genre'].astype(str).str.strip('[]').str.replace("'", '').str.split(', ')
+    return rows.assign(**{'Artist Genre': genres}).explode('Artist Genre')
+
+
+def genre_rows(rows):
+    genres = artist_genres(rows[['Artist Name', 'Position', 'Streams', 'Revenue', 'Artist Genre']])
+    return genres[genres['Artist Genre'] != '']
+
+
+def network_rows(rows):
+    # Streams per track, artist and year, one row per genre of the artist in list order, as
+    # network_data holds them
+    yearly = (rows.assign(Year=rows['Date'].dt.year)
+              .groupby(['Track URI2', 'Artist Name', 'Year'], observed=True)
+              .agg({'Streams': 'sum', 'Artist Genre': 'first'})
+              .reset_index())
+    yearly = artist_genres(yearly).rename(columns={'Artist Genre': 'Genre'}).replace({'Genre': {'': np.nan}})
+    return yearly[['Track URI2', 'Artist Name', 'Genre', 'Year', 'Streams']]
+
+
+#### Appending ####
+def append_rows(data, rows):
+    # Categorical columns keep their codes (new values become new trailing categories) and
+    # numeric columns keep their width where the new values fit it
+    columns, added = {}, {}
+    for column in data.columns:
+        values = rows[column] if column in rows.columns else pd.Series(np.nan, index=rows.index)
+        if column == INDEX_COLUMN and column not in rows.columns:
+            values = pd.Series(np.arange(len(rows)) + (data[column].max() + 1 if len(data) else 0), index=rows.index)
+
+        dtype = data[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            new = pd.Index(values.dropna().unique()).difference(dtype.categories)
+            columns[column] = data[column].cat.add_categories(new) if len(new) else data[column]
+            added[column] = pd.Categorical(values, dtype=columns[column].dtype)
+            continue
+
+        columns[column] = data[column]
+        if pd.api.types.is_integer_dtype(dtype) and values.notna().all():
+            width = np.iinfo(dtype)
+            if values.between(width.min, width.max).all():
+                values = values.astype(dtype)
+        elif pd.api.types.is_float_dtype(dtype):
+            values = values.astype(dtype)
+        added[column] = values
+
+    return pd.concat([pd.DataFrame(columns), pd.DataFrame(added, index=rows.index)], ignore_index=True)
+
+
+def merge_network_rows(network_data, rows):
+    # Streams of a track, artist, genre and year already in network_data are added to its
+    # row. The rest are inserted after their track and artist's last row, where a rebuild
+    # puts them: the genre edges run from each track's first row, so row order matters.
+    keys = ['Track URI2', 'Artist Name', 'Genre', 'Year']
+    yearly = network_rows(rows).astype({key: object for key in keys})
+
+    positions = np.flatnonzero(network_data['Track URI2'].isin(yearly['Track URI2'].unique()))
+    existing = network_data.iloc[positions][keys].astype(object).assign(position=positions)
+    matched = yearly.merge(existing, on=keys, how='left')
+    found = matched['position'].notna().to_numpy()
+
+    streams = network_data['Streams'].to_numpy().copy()
+    np.add.at(streams, matched.loc[found, 'position'].astype(np.int64).to_numpy(),
+              matched.loc[found, 'Streams'].to_numpy().astype(streams.dtype))
+
+    new = yearly[~found]
+    last = existing.groupby(['Track URI2', 'Artist Name'])['position'].max()
+    anchors = new.join(last, on=['Track URI2', 'Artist Name'])['position'].fillna(np.inf).to_numpy()
+
+    merged = append_rows(network_data.assign(Streams=streams), new)
+    order = np.argsort(np.r_[np.arange(len(network_data)), anchors + 0.5], kind='stable')
+    return merged.take(order).reset_index(drop=True)
+
+
+#### Ingesting ####
+def ingest_path(rows, directory=INGEST_DIR):
+    return os.path.join(directory, '{:%Y-%m-%d}_{:%Y-%m-%d}.feather'.format(rows['Date'].min(), rows['Date'].max()))
+
+
+class ChartIngest:
+    def __init__(self, registry, directory=INGEST_DIR):
+        self.registry = registry
+        self.directory = directory
+        self.applied = set()
+        self.seen = None
+        self._lock = threading.Lock()
+
+        # Set in workers forked from a preloaded master (see serve.py): the master applies
+        # new days once and replaces the workers, instead of every worker applying them to
+        # its own private copy of the tables
+        self.master = None
+
+    def refresh(self):
+        # Applies any days added since the last look; a stat of the directory when there are none
+        try:
+            mtime = os.path.getmtime(self.directory)
+        except OSError:
+            return
+        if mtime == self.seen:
+            return
+
+        with self._lock:
+            if mtime == self.seen:
+                return
+
+            pending = sorted(name for name in os.listdir(self.directory)
+                             if name.endswith('.feather') and name not in self.applied)
+            if pending and self.master is not None:
+                self.request_reload(pending)
+            elif pending:
+                latest = self.registry['collab_data']['Date'].max()
+                rows = pd.concat([feather.read_feather(os.path.join(self.directory, name)) for name in pending],
+                                 ignore_index=True)
+                rows = rows[pd.to_datetime(rows['Date']) > latest]
+                if len(rows):
+                    self.apply(rows)
+
+            self.applied.update(pending)
+            self.seen = mtime
+
+    def request_reload(self, pending):
+        # Only the first worker to see a batch creates its marker and signals the master,
+        # so the workers are replaced once per batch
+        try:
+            os.close(os.open(os.path.join(self.directory, pending[-1] + RELOAD_SUFFIX), os.O_CREAT | os.O_EXCL))
+        except FileExistsError:
+            return
+
+        logger.info('Asking the master to apply %d queued files', len(pending))
+        os.kill(self.master, signal.SIGHUP)
+
+    def apply(self, rows):
+        registry = self.registry
+        collab_data = registry['collab_data']
+        chart_rows = derive_columns(collab_data, rows)
+
+        updated = {
+            'collab_data': append_rows(collab_data, chart_rows),
+            'collab_genres': append_rows(registry['collab_genres'], genre_rows(chart_rows)),
+            'network_data': merge_network_rows(registry['network_data'], chart_rows),
+        }
+
+        # The cubes already built only take in the new rows
+        for name, (source, dedup, key) in CUBE_DIMENSIONS.items():
+            if registry.is_loaded('cube_' + name):
+                new_rows = updated[source].iloc[len(registry[source]):]
+                updated['cube_' + name] = update_cube_table(registry['cube_' + name], registry[source], new_rows,
+                                                            dedup, key)
+
+        for name, value in updated.items():
+            registry.put(name, value)
+
+        # Everything else built from the data (rankings, series, networks, search) is rebuilt
+        # on its next use
+        registry.invalidate([name for name in registry.loaded() if name not in DATASETS and name not in updated])
+        clear_caches()
+
+        logger.info('Ingested %d chart rows for %s to %s', len(chart_rows),
+                    '{:%Y-%m-%d}'.format(chart_rows['Date'].min()), '{:%Y-%m-%d}'.format(chart_rows['Date'].max()))
+        return chart_rows
+
+
+def add_ingest_hook(server, chart_ingest):
+    @server.before_request
+    def ingest_new_days():
+        chart_ingest.refresh()
+
+
+#### Command Line ####
+def add_days(paths, directory=INGEST_DIR):
+    registry = DatasetRegistry()
+    ChartIngest(registry, directory).refresh()
+
+    # Checked against everything charted so far, so a bad file never reaches the app
+    rows = pd.concat([pd.read_csv(path) for path in paths], ignore_index=True)
+    rows = derive_columns(registry['collab_data'], rows)[CHART_COLUMNS]
+
+    os.makedirs(directory, exist_ok=True)
+    path = ingest_path(rows, directory)
+    feather.write_feather(rows, path + '.tmp', compression='uncompressed')
+    os.replace(path + '.tmp', path)
+
+    return path, len(rows)
+
+
+def compact(directory=INGEST_DIR):
+    registry = DatasetRegistry()
+    ChartIngest(registry, directory).refresh()
+
+    paths = [write_store_dataset(name, registry[name]) for name in INGESTED_DATASETS]
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith(('.feather', RELOAD_SUFFIX)):
+                os.remove(os.path.join(directory, name))
+
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Spotify Top 200 daily ingestion')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help='queue new chart days for the running app')
+    add.add_argument('paths', nargs='+', help='CSV files of chart rows')
+
+    commands.add_parser('compact', help='write the queued days into the Arrow store')
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == 'add':
+        path, rows = add_days(args.paths)
+        print('Queued {} chart rows in {}'.format(rows, path))
+
+    elif args.command == 'compact':
+        for path in compact():
+            print('Wrote {}'.format(path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+#### Spotify Top 200 Callback Instrumentation ####
+
+# Records wall time, phase timings and response size for every registered callback and
+# serves them as Prometheus text on the app's /metrics route.
+#
+# Phases:
+#   load      - loading a dataset or building a derived table on its first use
+#   aggregate - time spent in the data layer (dataset/cube lookups, selections, series reads)
+#   figure    - the rest of the callback body, i.e. building the Plotly figure (0 on a cache hit)
+#   cache     - reading a memoized figure back on a cache hit
+#   serialize - JSON encoding of the figure and the Dash response
+#
+# Each phase's time excludes the phases nested in it, so a cold start's loads never show up
+# as aggregation or figure time.
+
+# Importing Libraries
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+SIZE_BUCKETS = [1e3, 1e4, 1e5, 1e6, 1e7]
+
+_active = threading.local()
+
+
+#### Histograms ####
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def prometheus_lines(self, name, labels):
+        with self._lock:
+            lines = []
+            cumulative = 0
+            for bound, count in zip(self.buckets + ['+Inf'], self.counts):
+                cumulative += count
+                lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, labels, bound, cumulative))
+            lines.append('{}_sum{{{}}} {}'.format(name, labels, self.sum))
+            lines.append('{}_count{{{}}} {}'.format(name, labels, self.count))
+            return lines
+
+
+class CallbackMetrics:
+    def __init__(self):
+        self.latency = {}
+        self.phases = {}
+        self.response_bytes = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, table, key, buckets):
+        with self._lock:
+            if key not in table:
+                table[key] = Histogram(buckets)
+            return table[key]
+
+    def record(self, callback, seconds, phases, size):
+        self.histogram(self.latency, callback, LATENCY_BUCKETS).observe(seconds)
+        self.histogram(self.response_bytes, callback, SIZE_BUCKETS).observe(size)
+        for name, phase_seconds in phases.items():
+            self.histogram(self.phases, (callback, name), LATENCY_BUCKETS).observe(phase_seconds)
+
+
+METRICS = CallbackMetrics()
+
+
+#### Phases ####
+def charge(entry, now):
+    name, since = entry
+    _active.phases[name] = _active.phases.get(name, 0.0) + now - since
+
+
+@contextmanager
+def phase(name):
+    # Adds the block's time, less that of other phases nested in it, to the current
+    # callback's phase totals. Nested blocks of an open phase, and anything inside a load,
+    # are counted where they are nested. Outside an instrumented callback it does nothing.
+    stack = getattr(_active, 'stack', None)
+    if stack is None or any(open_name in (name, 'load') for open_name, _ in stack):
+        yield
+        return
+
+    now = time.perf_counter()
+    if stack:
+        charge(stack[-1], now)
+    stack.append([name, now])
+    try:
+        yield
+    finally:
+        now = time.perf_counter()
+        charge(stack.pop(), now)
+        if stack:
+            stack[-1][1] = now
+
+
+def timed_phase(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+#### Wrapping Callbacks ####
+def instrument(name, callback):
+    @functools.wraps(callback)
+    def wrapper(*args, **kwargs):
+        _active.phases, _active.stack = {}, []
+        start = time.perf_counter()
+        try:
+            response = callback(*args, **kwargs)
+        finally:
+            total = time.perf_counter() - start
+            phases, _active.phases, _active.stack = _active.phases, None, None
+
+        # Callback bodies are marked as 'compute' (by memoize_callback, or timed_phase for the
+        # callbacks without a cache) and a cache hit's read as 'cache'; the body's own time is
+        # the figure's, and the time outside every phase is the figure's and Dash's JSON
+        # encoding. A callback that marks neither has no measured split, so its time outside
+        # the other phases counts as the figure's and no serialize time is recorded.
+        rest = max(total - sum(phases.values()), 0.0)
+        if 'compute' in phases or 'cache' in phases:
+            phases['figure'], phases['serialize'] = phases.pop('compute', 0.0), rest
+        else:
+            phases['figure'] = rest
+
+        # Dash returns the serialized response, so its length is the payload size
+        METRICS.record(name, total, phases, len(response) if isinstance(response, (str, bytes)) else 0)
+        return response
+
+    return wrapper
+
+
+def instrument_callbacks(app):
+    for entry in app.callback_map.values():
+        callback = entry['callback']
+        if not getattr(callback, 'instrumented', False):
+            entry['callback'] = instrument(callback.__name__, callback)
+            entry['callback'].instrumented = True
+
+
+#### Prometheus Endpoint ####
+def prometheus_text(caches):
+    lines = []
+
+    lines.append('# TYPE spotify_callback_seconds histogram')
+    for callback, histogram in sorted(METRICS.latency.items()):
+        lines.extend(histogram.prometheus_lines('spotify_callback_seconds', 'callback="{}"'.format(callback)))
+
+    lines.append('# TYPE spotify_callback_phase_seconds histogram')
+    for (callback, name), histogram in sorted(METRICS.phases.items()):
+        lines.extend(histogram.prometheus_lines('spotify_callback_phase_seconds',
+                                                'callback="{}",phase="{}"'.format(callback, name)))
+
+    lines.append('# TYPE spotify_callback_response_bytes histogram')
+    for callback, histogram in sorted(METRICS.response_bytes.items()):
+        lines.extend(histogram.prometheus_lines('spotify_callback_response_bytes',
+                                                'callback="{}"'.format(callback)))
+
+    for counter in ['hits', 'misses', 'evictions']:
+        lines.append('# TYPE spotify_cache_{}_total counter'.format(counter))
+        for name, cache in sorted(caches.items()):
+            lines.append('spotify_cache_{}_total{{cache="{}"}} {}'.format(counter, name, cache.info()[counter]))
+
+    return '\n'.join(lines) + '\n'
+
+
+def add_metrics_route(server, caches, path='/metrics'):
+    @server.route(path)
+    def metrics():
+        return Response(prometheus_text(caches), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,318 @@
+#### Spotify Top 200 Genre Network ####
+
+# Building blocks for the genre network on the Additional Info tab.
+
+# Importing Libraries
+import hashlib
+import logging
+import os
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from caching import CACHES, CallbackCache
+from data_store import STORE_DIR
+from instrumentation import timed_phase
+
+# Genres left out of the network
+EXCLUDED_GENRES = ['unknown', 'other']
+
+# Node layouts, computed once per node and edge set and kept on disk between runs
+LAYOUT_DIR = os.environ.get('SPOTIFY_LAYOUT_DIR', os.path.join(STORE_DIR, 'layouts'))
+LAYOUT_SEED = 0
+LAYOUTS = {
+    'circular': lambda graph: nx.circular_layout(graph),
+    'spring': lambda graph: nx.spring_layout(graph, seed=LAYOUT_SEED),
+    'spectral': lambda graph: nx.spectral_layout(graph),
+}
+
+# Edge pruning modes -> the value used when none is entered (edges per genre, edges overall,
+# or minimum weight as a percentage of the heaviest edge)
+PRUNING_DEFAULTS = {
+    'per_genre': 3,
+    'overall': 200,
+    'min_weight': 5,
+}
+
+# Two digit hex for every 0 - 255 channel value
+HEX_DIGITS = np.array(['{:02x}'.format(i) for i in range(256)], dtype=object)
+
+logger = logging.getLogger(__name__)
+
+
+#### Edge List ####
+def create_edgelist(data):
+    # One edge per extra genre on a track, from the track's first genre: tracks in order
+    # of first appearance, genres in row order
+    codes, uris = pd.factorize(data['Track URI2'], use_na_sentinel=False)
+    genres = data['Genre'].to_numpy()
+
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+
+    # Row (in sorted order) where each track's run starts
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(order) else order
+    run_start = np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    others = np.arange(len(order)) != run_start
+
+    edge_list = pd.DataFrame({'Track URI2': uris.to_numpy()[sorted_codes[others]],
+                              'Artist Genre': genres[order[run_start[others]]],
+                              'Collaborator Genre': genres[order[others]]})
+
+    return edge_list
+
+
+#### Track Streams ####
+# Streams per track, overall and per year, keyed by an integer track code so edge weights
+# are a gather instead of a join on the URI strings.
+class TrackStreams:
+    def __init__(self, network_data):
+        codes, self.tracks = pd.factorize(network_data['Track URI2'])
+        self.years = np.sort(network_data['Year'].unique())
+
+        valid = codes >= 0
+        streams = network_data['Streams'].to_numpy()[valid]
+        cells = self.years.searchsorted(network_data['Year'].to_numpy()[valid]) * len(self.tracks) + codes[valid]
+        totals = np.bincount(cells, weights=streams, minlength=len(self.years) * len(self.tracks))
+
+        self.by_year = totals.astype(streams.dtype).reshape(len(self.years), len(self.tracks))
+        self.total = self.by_year.sum(axis=0)
+
+    def codes(self, uris):
+        return self.tracks.get_indexer(uris)
+
+    def year_indexes(self, years=None):
+        if not years:
+            return np.arange(len(self.years))
+        return np.flatnonzero(np.isin(self.years, years))
+
+    def streams(self, codes, year_indexes=None):
+        totals = self.total if year_indexes is None else self.by_year[year_indexes].sum(axis=0)
+        return np.where(codes >= 0, totals[codes], 0)
+
+
+#### Genre Co-occurrence Matrices ####
+# Genre x genre edge counts and stream sums, plus per genre artist counts, precomputed
+# once. Tracks are grouped by the set of years they charted in, so a year selection sums
+# the groups it overlaps and a track charting in several selected years is still only
+# counted once, as drop_duplicates over the selected years would. Stream sums are kept per
+# year, so the Streams weights only count the selected years.
+#
+# A track whose artist and genre rows are not the same (in the same order) in every year
+# it charted in can have different edges per selection; those few tracks are kept as rows
+# and added in on each selection.
+class GenreNetwork:
+    def __init__(self, network_data, track_streams):
+        self.track_streams = track_streams
+        self.years = track_streams.years
+
+        genres = network_data['Genre'].dropna().unique()
+        self.genres = pd.Index(np.sort(genres[~np.isin(genres, EXCLUDED_GENRES)]))
+
+        data = network_data[['Track URI2', 'Artist Name', 'Genre', 'Year']].drop_duplicates(ignore_index=True)
+        uniform = self.uniform_tracks(data)
+        self.mixed = data[~uniform].reset_index(drop=True)
+
+        # One row per track, artist and genre, with a bit set for each year it charted in
+        rows = data[uniform].assign(Years=2 ** self.years.searchsorted(data.loc[uniform, 'Year']))
+        rows = rows.groupby(['Track URI2', 'Artist Name', 'Genre'], sort=False, dropna=False)['Years'].sum()
+        rows = rows.reset_index()
+
+        self.groups = []
+        for mask, group in rows.groupby('Years'):
+            year_indexes = [i for i in range(len(self.years)) if mask >> i & 1]
+            self.groups.append((mask,) + self.build_group(group, [[i] for i in year_indexes]))
+
+    @staticmethod
+    def uniform_tracks(data):
+        # Each of the track's years holds all of its rows, in the same order
+        track, track_year = data['Track URI2'], data.groupby(['Track URI2', 'Year'], dropna=False)
+        row = data.groupby(['Track URI2', 'Artist Name', 'Genre'], sort=False, dropna=False).ngroup()
+        place = row * len(data) + track_year.cumcount()
+
+        rows = row.groupby(track, dropna=False).transform('nunique')
+        uniform = ((track_year['Year'].transform('size') == rows) &
+                   (place.groupby(track, dropna=False).transform('nunique') == rows))
+        return uniform.groupby(track, dropna=False).transform('all')
+
+    def build_group(self, rows, year_groups):
+        shape = (len(self.genres), len(self.genres))
+
+        artist_genres = self.genres.get_indexer(rows.loc[rows['Artist Name'].notna(), 'Genre'])
+        artists = np.bincount(artist_genres[artist_genres >= 0], minlength=len(self.genres))
+
+        # Self loops and excluded genres are dropped; duplicate pairs are summed
+        edges = create_edgelist(rows)
+        u = self.genres.get_indexer(edges['Artist Genre'])
+        v = self.genres.get_indexer(edges['Collaborator Genre'])
+        keep = (u >= 0) & (v >= 0) & (u != v)
+        u, v = u[keep], v[keep]
+        tracks = self.track_streams.codes(edges['Track URI2'][keep])
+
+        counts = sparse.csr_matrix((np.ones(len(u), dtype=np.int64), (u, v)), shape=shape)
+
+        # One stream sum matrix per group of years, keyed by the first year's index
+        streams = {}
+        for year_indexes in year_groups:
+            weights = self.track_streams.streams(tracks, year_indexes)
+            streams[year_indexes[0]] = sparse.csr_matrix((weights, (u, v)), shape=shape)
+
+        return artists, counts, streams
+
+    @timed_phase('aggregate')
+    def select(self, years=None, genres=None):
+        year_indexes = self.track_streams.year_indexes(years)
+        mask = int(sum(2 ** year_indexes))
+
+        mixed = self.mixed[self.mixed['Year'].isin(years)] if years else self.mixed
+        mixed = mixed[['Track URI2', 'Artist Name', 'Genre']].drop_duplicates()
+        groups = [group[1:] for group in self.groups if group[0] & mask]
+        groups.append(self.build_group(mixed, [year_indexes] if len(year_indexes) else []))
+
+        artists = sum(group[0] for group in groups)
+        counts = sum(group[1] for group in groups)
+        streams = sum([group[2][i] for group in groups for i in year_indexes if i in group[2]],
+                      sparse.csr_matrix(counts.shape, dtype=self.track_streams.total.dtype))
+
+        # A genre selection keeps the edges from or to the selected genres; an edge between
+        # two selected genres is counted from both ends
+        if genres:
+            selected = sparse.diags(self.genres.isin(genres).astype(np.int64), dtype=np.int64)
+            counts = selected @ counts + counts @ selected
+            streams = selected @ streams + streams @ selected
+
+        nodes = pd.DataFrame({'Genre': self.genres, 'Count': artists})
+        nodes = nodes[nodes['Count'] > 0].reset_index(drop=True)
+
+        counts, streams = counts.tocoo(), streams.tocsr()
+        keep = counts.data > 0
+        u, v = counts.row[keep], counts.col[keep]
+        edge_streams = np.asarray(streams[u, v]).ravel() if len(u) else np.zeros(0, dtype=streams.dtype)
+        edges = pd.DataFrame({'Artist Genre': self.genres[u], 'Collaborator Genre': self.genres[v],
+                              'Count': counts.data[keep], 'Streams': edge_streams,
+                              'Order': u * len(self.genres) + v})
+        edges = edges.sort_values('Order', ignore_index=True).drop(columns='Order')
+
+        return nodes, edges
+
+
+#### Pruning ####
+def top_edges(edges, metric, n):
+    # The n heaviest edges, ties broken by edge order; the result keeps edge order
+    order = np.argsort(-edges[metric].to_numpy(), kind='stable')[:max(int(n), 0)]
+    return edges.iloc[np.sort(order)].reset_index(drop=True)
+
+
+def prune_edges(edges, metric, mode=None, value=None):
+    if mode not in PRUNING_DEFAULTS:
+        return edges
+    if value is None:
+        value = PRUNING_DEFAULTS[mode]
+
+    weights = edges[metric]
+
+    if mode == 'per_genre':
+        # Keep an edge if it is one of the k heaviest of either of its genres
+        k = max(int(value), 0)
+        keep = ((weights.groupby(edges['Artist Genre']).rank(method='first', ascending=False) <= k) |
+                (weights.groupby(edges['Collaborator Genre']).rank(method='first', ascending=False) <= k))
+        return edges[keep].reset_index(drop=True)
+
+    if mode == 'overall':
+        return top_edges(edges, metric, value)
+
+    return edges[weights >= weights.max() * value / 100].reset_index(drop=True)
+
+
+#### Layouts ####
+# Node positions by layout, node set and (for the layouts that use them) edges. Force
+# directed layouts take far too long to run per request, so every layout is computed once
+# and kept in memory and, given a directory, as a .npy file named by the key's hash.
+class GraphLayouts:
+    def __init__(self, directory=LAYOUT_DIR, maxsize=64, name='network_layouts'):
+        self.directory = directory
+        self.cache = CACHES[name] = CallbackCache(maxsize=maxsize, ttl=None)
+
+    @staticmethod
+    def key(layout, nodes, edges):
+        digest = hashlib.sha1(layout.encode())
+        digest.update('\0'.join(nodes).encode())
+        if edges is not None and layout != 'circular':
+            digest.update('\0'.join(u + '\1' + v for u, v in edges).encode())
+        return '{}-{}'.format(layout, digest.hexdigest())
+
+    @staticmethod
+    def compute(layout, nodes, edges):
+        graph = nx.Graph()
+        graph.add_nodes_from(nodes)
+        graph.add_edges_from(edges or [])
+
+        pos = LAYOUTS[layout](graph)
+        return np.array([pos[node] for node in nodes], dtype=float).reshape(len(nodes), 2)
+
+    def positions(self, layout, nodes, edges=None):
+        # Positions in the order of nodes; edges are (u, v) genre pairs
+        nodes = [str(node) for node in nodes]
+        edges = None if edges is None else [(str(u), str(v)) for u, v in edges]
+        key = self.key(layout, nodes, edges)
+
+        pos = self.cache.get(key)
+        if pos is None and self.directory is None:
+            pos = self.compute(layout, nodes, edges)
+            self.cache.put(key, pos)
+        elif pos is None:
+            path = os.path.join(self.directory, key + '.npy')
+            if os.path.exists(path):
+                pos = np.load(path)
+            else:
+                pos = self.compute(layout, nodes, edges)
+                self.save(path, pos)
+            self.cache.put(key, pos)
+
+        return pos
+
+    def save(self, path, pos):
+        # Written to a temporary file first so another worker never reads half a layout
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + '.tmp', 'wb') as output:
+                np.save(output, pos)
+            os.replace(path + '.tmp', path)
+        except OSError as error:
+            logger.warning('Could not save layout %s: %s', path, error)
+
+
+GRAPH_LAYOUTS = GraphLayouts()
+
+# Artist ego networks: one layout per artist and hop count, so only the most recent are
+# kept, and only in memory, as the disk would otherwise fill up as users browse artists
+EGO_LAYOUTS = GraphLayouts(directory=None, maxsize=256, name='ego_layouts')
+
+
+#### Figure Arrays ####
+def hex_colors(colormap, values):
+    # mpl.colors.to_hex(colormap(value)) for every value in one colormap lookup
+    rgb = np.round(colormap(np.asarray(values, dtype=float))[:, :3] * 255).astype(int)
+    return '#' + HEX_DIGITS[rgb[:, 0]] + HEX_DIGITS[rgb[:, 1]] + HEX_DIGITS[rgb[:, 2]]
+
+
+def arrow_angles(start, end):
+    # Marker angles in degrees clockwise from up, pointing each arrow from start to end
+    direction = end - start
+    return np.degrees(np.arctan2(direction[:, 0], direction[:, 1]))
+
+
+def segment_coordinates(start, end):
+    # start, end, None for every segment, so all segments draw as one line trace
+    coordinates = np.full((len(start), 3), None, dtype=object)
+    coordinates[:, 0] = start
+    coordinates[:, 1] = end
+    return coordinates.ravel().tolist()
+
+
+def register_network(registry):
+    registry.register('track_streams', lambda: TrackStreams(registry['network_data']))
+    registry.register('genre_network',
+                      lambda: GenreNetwork(registry['network_data'], registry['track_streams']))
@@ -0,0 +1,127 @@
+#### Spotify Top 200 Name Search ####
+
+# Case insensitive prefix and substring search over the track and artist names behind the
+# selection dropdowns. The dropdowns only ever hold one page of names: the first page when
+# rendered, then whatever matches the text typed into them.
+#
+# Prefixes are binary searched in the sorted names. Substrings go through an n-gram index
+# (every run of up to NGRAM_SIZE characters after each name's first, to the names holding
+# it): the query's n-grams narrow the names down, and only those are checked for the query.
+
+# Importing Libraries
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed_phase
+
+SEARCH_PAGE_SIZE = int(os.environ.get('SPOTIFY_SEARCH_PAGE_SIZE', 50))
+
+NGRAM_SIZE = 3
+
+# Bits per code point when an n-gram is packed into one integer
+CODE_BITS = 21
+
+
+#### N-grams ####
+def ngram_codes(points, size):
+    # The code points (offset by one, so runs of different sizes never share a code) of each
+    # n-gram packed into one integer
+    codes = np.zeros(points.shape[:-1], dtype=np.int64)
+    for i in range(size):
+        codes = (codes << CODE_BITS) | (points[..., i].astype(np.int64) + 1)
+    return codes
+
+
+def code_points(text):
+    return np.array([text]).view(np.uint32)
+
+
+#### Search Index ####
+class NameSearch:
+    def __init__(self, names):
+        # Names in the order the dropdowns have always listed them (first appearance)
+        self.names = pd.Index(pd.Series(names).dropna().unique())
+        self.folded = self.names.astype(str).str.casefold().to_numpy(dtype=str)
+
+        # Folded names sorted, so a prefix is a binary searched run
+        self.order = np.argsort(self.folded, kind='stable')
+        self.sorted = self.folded[self.order]
+
+        self.build_ngrams()
+
+    def build_ngrams(self):
+        # Numpy strings are fixed width UCS-4, so the folded names are a names x width grid of
+        # code points padded with zeros
+        width = self.folded.dtype.itemsize // 4
+        points = self.folded.view(np.uint32).reshape(len(self.folded), width)
+        lengths = np.char.str_len(self.folded)
+
+        codes, names = [], []
+        for size in range(1, NGRAM_SIZE + 1):
+            for start in range(1, width - size + 1):
+                rows = np.flatnonzero(lengths >= start + size)
+                if not len(rows):
+                    break
+                codes.append(ngram_codes(points[rows, start:start + size], size))
+                names.append(rows.astype(np.int32))
+
+        codes = np.concatenate(codes) if codes else np.empty(0, dtype=np.int64)
+        names = np.concatenate(names) if names else np.empty(0, dtype=np.int32)
+
+        # One entry per n-gram and name, sorted by n-gram then listing order
+        order = np.lexsort((names, codes))
+        codes, names = codes[order], names[order]
+        first = np.r_[True, (codes[1:] != codes[:-1]) | (names[1:] != names[:-1])]
+        codes, self.ngram_names = codes[first], names[first]
+
+        starts = np.r_[True, codes[1:] != codes[:-1]] if len(codes) else np.empty(0, dtype=bool)
+        self.ngram_codes = codes[starts]
+        self.ngram_offsets = np.r_[np.flatnonzero(starts), len(codes)]
+
+    def ngram_positions(self, code):
+        i = np.searchsorted(self.ngram_codes, code)
+        if i == len(self.ngram_codes) or self.ngram_codes[i] != code:
+            return np.empty(0, dtype=self.ngram_names.dtype)
+        return self.ngram_names[self.ngram_offsets[i]:self.ngram_offsets[i + 1]]
+
+    def contains_positions(self, query):
+        # Names holding every n-gram of the query past their first character, checked for
+        # the query itself; each posting list is sorted, so the result stays in listing order
+        size = min(len(query), NGRAM_SIZE)
+        points = code_points(query)
+        windows = np.lib.stride_tricks.sliding_window_view(points, size)
+        postings = sorted((self.ngram_positions(code) for code in np.unique(ngram_codes(windows, size))), key=len)
+
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+
+        return candidates[np.char.find(self.folded[candidates], query) > 0]
+
+    def prefix_positions(self, query):
+        start = np.searchsorted(self.sorted, query, side='left')
+        end = np.searchsorted(self.sorted, query + '\U0010ffff', side='left')
+        return np.sort(self.order[start:end])
+
+    @timed_phase('aggregate')
+    def search(self, query=None, limit=SEARCH_PAGE_SIZE):
+        # Names starting with the query, then names containing it elsewhere, each in
+        # listing order
+        query = (query or '').strip().casefold()
+        if not query:
+            return list(self.names[:limit])
+
+        positions = self.prefix_positions(query)[:limit]
+        if len(positions) < limit:
+            contains = self.contains_positions(query)
+            positions = np.concatenate([positions, contains[:limit - len(positions)]])
+
+        return list(self.names[positions])
+
+
+def register_search(registry):
+    registry.register('track_search', lambda: NameSearch(registry['collab_data']['Track Name']))
+    registry.register('artist_search', lambda: NameSearch(registry['collab_data']['Artist Name']))
+    registry.register('collaborator_search', lambda: NameSearch(registry['artist_graph'].artists))
@@ -0,0 +1,117 @@
+#### Spotify Top 200 Production Server ####
+
+# Runs the app under gunicorn's preforking server instead of the single process Flask
+# development server.
+#
+# Usage:
+#   python serve.py                                   # one worker per core, data preloaded
+#   python serve.py --workers 4 --threads 8 --bind 0.0.0.0:8050
+#   gunicorn serve:server                             # any WSGI server can use `server`
+#
+# With --preload (the default) every dataset and derived table is loaded once in the master
+# before the workers are forked, so the workers share those pages copy-on-write instead of
+# each holding their own copy. With --no-preload each worker loads tables lazily into its
+# own heap: reading the Arrow store copies every column out of the mapped file, so once all
+# tabs have been used, memory is the worker count times the full set of datasets and derived
+# tables. `gunicorn serve:server` only imports the app, so its workers load lazily the same way.
+#
+# With --preload, chart days queued by `python ingest.py add` are applied in the master: the
+# first worker to see them sends it SIGHUP, and the master applies them once and replaces
+# the workers. Without it, every worker applies them to its own copy of the tables.
+
+# Importing Libraries
+import argparse
+import gc
+import importlib.util
+import logging
+import os
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Final App.py')
+
+
+#### Loading The App ####
+def load_app_module():
+    # The app file name has a space in it, so it is loaded from its path
+    spec = importlib.util.spec_from_file_location('final_app', APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def preload_datasets(module):
+    # Queued chart days first, so the derived tables are built from the updated data
+    module.chart_ingest.refresh()
+    module.datasets.preload()
+
+    # Move everything loaded so far out of the garbage collector's generations, so
+    # collections in the workers do not touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+
+def apply_new_days(arbiter):
+    # A worker saw queued chart days and sent SIGHUP: they are applied here once, before
+    # gunicorn forks the replacement workers, which then share the updated tables
+    preload_datasets(final_app)
+
+
+def hand_new_days_to_master(arbiter, worker):
+    final_app.chart_ingest.master = worker.ppid
+
+
+final_app = load_app_module()
+server = final_app.app.server
+
+
+#### Gunicorn ####
+def default_workers():
+    return int(os.environ.get('SPOTIFY_WORKERS', os.cpu_count() or 1))
+
+
+def run_gunicorn(options):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit('gunicorn is required for `python serve.py`: pip install gunicorn')
+
+    class SpotifyApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return server
+
+    SpotifyApplication().run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the Spotify Top 200 app with gunicorn')
+    parser.add_argument('--bind', default=os.environ.get('SPOTIFY_BIND', '0.0.0.0:8050'))
+    parser.add_argument('--workers', type=int, default=default_workers())
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('SPOTIFY_THREADS', 4)))
+    parser.add_argument('--timeout', type=int, default=60)
+    parser.add_argument('--preload', action=argparse.BooleanOptionalAction, default=True,
+                        help='load every dataset in the master before forking workers (default: on)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.preload:
+        preload_datasets(final_app)
+
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'timeout': args.timeout,
+        'preload_app': args.preload,
+    }
+    if args.preload:
+        options.update(on_reload=apply_new_days, post_fork=hand_new_days_to_master)
+
+    run_gunicorn(options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+#### Test Setup ####
+
+# The app's modules live at the repository root rather than in a package
+
+# Importing Libraries
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,58 @@
+#### Aggregate Cube Tests ####
+
+# Incremental cube updates against a rebuild from the updated data, and the rankings'
+# partial sort against a stable pandas sort.
+
+# Importing Libraries
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import build_cube_table, top_positions, update_cube_table
+from ingest import append_rows
+
+
+def make_chart_data(seed, rows=400):
+    rng = np.random.default_rng(seed)
+    tracks = rng.integers(0, 40, rows)
+    data = pd.DataFrame({
+        'Track Name': pd.Categorical(['Track {}'.format(track) for track in tracks]),
+        'Track URI2': ['uri{}'.format(track) for track in tracks],
+        'No. of Artists': rng.integers(1, 4, rows).astype(np.int16),
+        'Position': rng.integers(1, 201, rows).astype(np.int16),
+        'Streams': rng.integers(10 ** 4, 10 ** 6, rows).astype(np.int32),
+    })
+    data['Revenue'] = (data['Streams'] * 0.00331).astype(np.float32)
+    return data
+
+
+@pytest.mark.parametrize('dedup, key', [
+    (None, 'Track Name'),
+    (None, 'No. of Artists'),
+    ('Track URI2', 'No. of Artists'),
+    ('Track URI2', 'Track Name'),
+])
+@pytest.mark.parametrize('seed', [0, 1])
+def test_update_matches_rebuild(seed, dedup, key):
+    # The old rows' categories only hold the tracks seen so far, as a loaded dataset would
+    chart_data = make_chart_data(seed)
+    data = chart_data.iloc[:300].astype({'Track Name': str}).astype({'Track Name': 'category'})
+    rows = chart_data.iloc[300:].astype({'Track Name': str}).reset_index(drop=True)
+    updated = append_rows(data, rows)
+
+    table = update_cube_table(build_cube_table(data, dedup, key), data, updated.iloc[len(data):], dedup, key)
+    expected = build_cube_table(updated, dedup, key)
+
+    pd.testing.assert_frame_equal(table, expected, check_exact=False, rtol=1e-6)
+
+
+@pytest.mark.parametrize('ascending', [True, False])
+@pytest.mark.parametrize('n', [1, 5, 15, 60])
+def test_top_positions_matches_stable_sort(n, ascending):
+    # Few distinct values, so most ranks are ties, and some NaN
+    rng = np.random.default_rng(n)
+    values = rng.integers(0, 8, 50).astype(float)
+    values[rng.random(50) < 0.1] = np.nan
+
+    expected = pd.Series(values).sort_values(ascending=ascending, kind='stable', na_position='last').index[:n]
+    np.testing.assert_array_equal(top_positions(values, n, ascending), expected)
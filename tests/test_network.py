@@ -0,0 +1,79 @@
+#### Genre Network Tests ####
+
+# GenreNetwork.select against the original per request filtering, de-duplication and
+# regrouping of network_data, for every year selection.
+
+# Importing Libraries
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.edgelist import create_edgelist_loop
+from network import GenreNetwork, TrackStreams
+
+YEARS = [2017, 2018, 2019, 2020]
+GENRES = ['pop', 'rap', 'latin', 'rock', 'edm', 'unknown', 'other']
+
+
+def make_network_data(seed):
+    # Tracks by one to three artists of one to three genres, charting in a random set of
+    # years. Some tracks lose or reorder rows in a year, so their edges differ per selection.
+    rng = np.random.default_rng(seed)
+    artist_genres = {'Artist {}'.format(i): list(rng.choice(GENRES, rng.integers(1, 4), replace=False))
+                     for i in range(20)}
+
+    rows = []
+    for track in range(60):
+        artists = rng.choice(list(artist_genres), rng.integers(1, 4), replace=False)
+        members = [(artist, genre) for artist in artists for genre in artist_genres[artist]]
+        years = [year for year in YEARS if rng.random() < 0.5] or [YEARS[0]]
+
+        for year in years:
+            year_members = list(members)
+            if len(year_members) > 1 and rng.random() < 0.2:
+                year_members = year_members[1:] if rng.random() < 0.5 else year_members[::-1]
+            for artist, genre in year_members:
+                rows.append(('uri{}'.format(track), artist, genre, year, int(rng.integers(1, 10 ** 6))))
+
+    data = pd.DataFrame(rows, columns=['Track URI2', 'Artist Name', 'Genre', 'Year', 'Streams'])
+    return data.sort_values('Year', kind='stable', ignore_index=True)
+
+
+def reference_network(network_data, years, genres):
+    # The network as generate_network_plotly built it before the matrices
+    data = network_data[network_data['Year'].isin(years)] if years else network_data
+    reduced = data[['Track URI2', 'Artist Name', 'Genre']].drop_duplicates(ignore_index=True)
+
+    nodes = reduced.groupby('Genre')['Artist Name'].count().reset_index(name='Count')
+    nodes = nodes[~nodes['Genre'].isin(['unknown', 'other'])].reset_index(drop=True)
+
+    edges = create_edgelist_loop(reduced)
+    edges = edges[(edges['Artist Genre'] != edges['Collaborator Genre']) &
+                  ~edges['Artist Genre'].isin(['unknown', 'other']) &
+                  ~edges['Collaborator Genre'].isin(['unknown', 'other'])]
+    if genres:
+        edges = pd.concat([edges[edges['Artist Genre'].isin(genres)], edges[edges['Collaborator Genre'].isin(genres)]])
+
+    track_streams = data.groupby('Track URI2')['Streams'].sum()
+    edges = edges.assign(Streams=edges['Track URI2'].map(track_streams))
+    edges = edges.groupby(['Artist Genre', 'Collaborator Genre']).agg(Count=('Track URI2', 'size'),
+                                                                       Streams=('Streams', 'sum'))
+    return nodes, edges.reset_index()
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_select_matches_reference(seed):
+    network_data = make_network_data(seed)
+    network = GenreNetwork(network_data, TrackStreams(network_data))
+    assert len(network.groups) > 1 and len(network.mixed)
+
+    for size in range(len(YEARS) + 1):
+        for years in itertools.combinations(YEARS, size):
+            for genres in [[], ['pop'], ['rap', 'latin']]:
+                nodes, edges = network.select(list(years), genres)
+                expected_nodes, expected_edges = reference_network(network_data, list(years), genres)
+
+                pd.testing.assert_frame_equal(nodes, expected_nodes, check_dtype=False)
+                pd.testing.assert_frame_equal(edges, expected_edges, check_dtype=False)
@@ -0,0 +1,43 @@
+#### Time Series Tests ####
+
+# Rolling window statistics from the prefix sums and sparse tables against pandas' time
+# based rolling windows over each track's daily values.
+
+# Importing Libraries
+import numpy as np
+import pandas as pd
+import pytest
+
+from timeseries import TrackTimeSeries
+
+
+def make_chart_data(seed, rows=600):
+    # Tracks charting on scattered days (gaps longer than the windows included), with a
+    # few rows missing their revenue
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'Track Name': ['Track {}'.format(track) for track in rng.integers(0, 12, rows)],
+        'Date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 120, rows), unit='D'),
+        'Position': rng.integers(1, 201, rows).astype(float),
+        'Streams': rng.integers(10 ** 4, 10 ** 6, rows).astype(float),
+    })
+    data['Revenue'] = data['Streams'] * 0.00331
+    data.loc[rng.random(rows) < 0.05, 'Revenue'] = np.nan
+    return data
+
+
+@pytest.mark.parametrize('stat', ['mean', 'max', 'min'])
+@pytest.mark.parametrize('window', [2, 7, 30])
+@pytest.mark.parametrize('metric', ['Position', 'Revenue'])
+def test_rolling_matches_pandas(metric, window, stat):
+    data = make_chart_data(window)
+    series = TrackTimeSeries(data)
+    tracks = list(series.tracks)
+
+    frame = series.frame(tracks, metric, 'Value', window=window, stat=stat)
+
+    daily = data.groupby(['Track Name', 'Date'])[metric].mean().reset_index(level=0)
+    expected = (daily.groupby('Track Name')[metric].rolling('{}D'.format(window)).agg(stat)
+                .reset_index(name='Value'))
+
+    pd.testing.assert_frame_equal(frame, expected, check_exact=False, rtol=1e-9)
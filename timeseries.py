@@ -0,0 +1,233 @@
+#### Spotify Top 200 Time Series ####
+
+# Daily per-track (and per-artist) averages of Position, Streams and Revenue, built once
+# from collab_data. Each metric is a sparse date x track matrix in CSC form over one shared
+# date axis, so the over time charts gather the columns of the selected tracks instead of
+# grouping collab_data per request, and rolling windows run down every column at once.
+
+# Importing Libraries
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from instrumentation import timed_phase
+
+METRICS = ['Position', 'Streams', 'Revenue']
+
+# Rolling window statistics over the date axis, computed for every track (or artist) at
+# once and kept on the series per (metric, window, statistic), so they go when it is rebuilt
+ROLLING_STATS = ['mean', 'max', 'min']
+
+# Most points drawn per series ('lttb' keeps the points that best preserve the shape,
+# 'minmax' each bucket's lowest and highest)
+SERIES_POINT_BUDGET = int(os.environ.get('SPOTIFY_SERIES_POINTS', 400))
+DOWNSAMPLING = os.environ.get('SPOTIFY_DOWNSAMPLING', 'lttb')
+
+
+#### Time Series Store ####
+class TrackTimeSeries:
+    def __init__(self, data, key='Track Name', metrics=METRICS):
+        daily = data.groupby([key, 'Date'], observed=True)[metrics].mean()
+
+        self.key = key
+        self.categorical = isinstance(data[key].dtype, pd.CategoricalDtype)
+        if self.categorical:
+            self.tracks = data[key].cat.categories
+        else:
+            self.tracks = pd.Index(np.sort(data[key].dropna().unique()))
+        self.dates = pd.DatetimeIndex(np.sort(data['Date'].dropna().unique()))
+
+        # Column c's dates and values are at indptr[c]:indptr[c + 1]; the groupby has
+        # already sorted them by track, then date
+        codes = self.tracks.get_indexer(daily.index.get_level_values(0))
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(self.tracks)))])
+        self.indices = self.dates.get_indexer(daily.index.get_level_values(1))
+        self.values = {metric: daily[metric].to_numpy() for metric in metrics}
+        self._rolling = {}
+
+    def matrix(self, metric):
+        return sparse.csc_array((self.values[metric], self.indices, self.indptr),
+                                shape=(len(self.dates), len(self.tracks)))
+
+    def columns(self, tracks):
+        # Entry positions of the selected tracks' columns, in track order, and each entry's track
+        codes = self.tracks.get_indexer(list(tracks))
+        codes = np.unique(codes[codes >= 0])
+
+        starts = self.indptr[codes]
+        lengths = self.indptr[codes + 1] - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return positions, np.repeat(codes, lengths)
+
+    def window_starts(self, days):
+        # For every entry, the first entry of its column within the `days` days ending on its
+        # date. Columns are date sorted runs, so one search over (column, day) keys finds all.
+        day = (self.dates - self.dates[0]).days.to_numpy()[self.indices] if len(self.dates) else self.indices
+        column = np.repeat(np.arange(len(self.tracks)), np.diff(self.indptr))
+        keys = column * (int(day.max(initial=0)) + days + 1) + day
+        return np.searchsorted(keys, keys - (days - 1), side='left')
+
+    def rolling(self, metric, days, stat='mean'):
+        key = (metric, days, stat)
+        values = self._rolling.get(key)
+        if values is None:
+            values = rolling_values(self.values[metric], self.window_starts(days), stat)
+            self._rolling[key] = values
+        return values
+
+    @timed_phase('aggregate')
+    def frame(self, tracks, metric, name, window=None, stat='mean'):
+        # Long format (track, date, value) rows, as groupby([key, 'Date']).mean() gives them,
+        # or their rolling `stat` over the last `window` days
+        positions, codes = self.columns(tracks)
+        keys = pd.Categorical.from_codes(codes, self.tracks) if self.categorical else self.tracks[codes]
+        values = self.values[metric] if window in (None, 1) else self.rolling(metric, window, stat)
+        return pd.DataFrame({self.key: keys,
+                             'Date': self.dates[self.indices[positions]],
+                             name: values[positions]})
+
+
+#### Rolling Windows ####
+def rolling_values(values, starts, stat):
+    # values[starts[i]:i + 1] reduced by stat for every i, skipping NaN as pandas does.
+    # Means come from prefix sums; max and min from a sparse table, where any window is
+    # covered by two overlapping power of two blocks.
+    values = values.astype(float)
+    ends = np.arange(len(values))
+
+    if stat == 'mean':
+        known = ~np.isnan(values)
+        sums = np.r_[0, np.cumsum(np.where(known, values, 0))]
+        counts = np.r_[0, np.cumsum(known)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (sums[ends + 1] - sums[starts]) / (counts[ends + 1] - counts[starts])
+
+    reduce = {'max': np.fmax, 'min': np.fmin}[stat]
+    lengths = ends - starts + 1
+    levels = np.log2(np.maximum(lengths, 1)).astype(int)
+
+    table = [values]
+    while len(table) <= levels.max(initial=0):
+        step = 1 << (len(table) - 1)
+        previous = table[-1]
+        table.append(np.r_[reduce(previous[:-step], previous[step:]), previous[len(previous) - step:]])
+
+    result = np.empty(len(values))
+    for level in np.unique(levels):
+        at = levels == level
+        result[at] = reduce(table[level][starts[at]], table[level][ends[at] - (1 << level) + 1])
+    return result
+
+
+#### Downsampling ####
+def lttb_indices(x, y, budget):
+    # Largest triangle three buckets: the first and last points, plus one point per bucket
+    # making the largest triangle with the point kept before it and the next bucket's mean
+    n = len(x)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+
+    bounds = np.linspace(1, n - 1, budget - 1).astype(int)
+    selected = np.empty(budget, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(budget - 2):
+        start, end = bounds[i], bounds[i + 1]
+        following = slice(end, bounds[i + 2]) if i + 2 < len(bounds) else slice(n - 1, n)
+        mean_x, mean_y = x[following].mean(), y[following].mean()
+
+        area = np.abs((x[a] - mean_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (mean_y - y[a]))
+        a = start + np.argmax(area)
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_indices(x, y, budget):
+    # The lowest and highest point of each of budget / 2 buckets, plus the end points
+    n = len(x)
+    if budget >= n or budget < 4:
+        return np.arange(n)
+
+    buckets = np.arange(n) * (budget // 2 - 1) // n
+    order = np.lexsort((y, buckets))
+    starts = np.searchsorted(buckets[order], np.arange(budget // 2 - 1))
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.concatenate([[0, n - 1], order[starts], order[ends]]))
+
+
+DOWNSAMPLERS = {
+    'lttb': lttb_indices,
+    'minmax': minmax_indices,
+}
+
+
+def zoom_window(relayout_data, axis='xaxis'):
+    # The x range a graph has been zoomed to, from its relayoutData, or None for the whole range
+    relayout_data = relayout_data or {}
+    if relayout_data.get(axis + '.autorange'):
+        return None
+    if axis + '.range[0]' in relayout_data and axis + '.range[1]' in relayout_data:
+        start, end = relayout_data[axis + '.range[0]'], relayout_data[axis + '.range[1]']
+    elif axis + '.range' in relayout_data:
+        start, end = relayout_data[axis + '.range']
+    else:
+        return None
+    return pd.Timestamp(start), pd.Timestamp(end)
+
+
+def zoom_argument(position):
+    # Replaces a callback's relayoutData argument with its x range (or None) before the
+    # callback cache keys on it, so relayouts that don't zoom (the autosize Plotly fires on
+    # first render, legend clicks) are served the cached full range figure
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            if len(args) > position:
+                args = args[:position] + (zoom_window(args[position]),) + args[position + 1:]
+            return func(*args)
+        return wrapper
+    return decorator
+
+
+@timed_phase('aggregate')
+def downsample(frame, key, value, window=None, budget=None, method=None):
+    # Thins every series in a long (key, Date, value) frame to the point budget. Inside a
+    # zoom window each series is kept at full resolution (or thinned to the budget within
+    # the window), so zooming in refines the view while the rest stays as context.
+    budget = SERIES_POINT_BUDGET if budget is None else budget
+    indices = DOWNSAMPLERS[method or DOWNSAMPLING]
+
+    codes = pd.factorize(frame[key])[0]
+    bounds = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1], True]) if len(frame) else np.array([0])
+    dates = frame['Date'].to_numpy()
+    x = dates.astype('datetime64[ns]').astype(np.int64).astype(float)
+    y = frame[value].to_numpy(dtype=float)
+
+    if window is not None:
+        window = tuple(np.datetime64(bound, 'ns') for bound in window)
+
+    keep = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        selected = start + indices(x[start:end], y[start:end], budget)
+
+        if window is not None:
+            inside = np.flatnonzero((dates[start:end] >= window[0]) & (dates[start:end] <= window[1]))
+            if len(inside):
+                inside = start + inside[indices(x[start + inside], y[start + inside], budget)]
+                selected = np.union1d(selected[(dates[selected] < window[0]) | (dates[selected] > window[1])], inside)
+
+        keep.append(selected)
+
+    if not keep:
+        return frame
+    return frame.iloc[np.sort(np.concatenate(keep))].reset_index(drop=True)
+
+
+def register_timeseries(registry):
+    registry.register('track_series', lambda: TrackTimeSeries(registry['collab_data']))
+    registry.register('artist_series', lambda: TrackTimeSeries(registry['collab_data'], key='Artist Name'))